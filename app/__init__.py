@@ -23,16 +23,32 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from redis import Redis
 import rq
-from app import Config
 import logging
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+db = SQLAlchemy()
+migrate = Migrate()
 
-from app import routes, result_model, errors
 
-app.redis = Redis.from_url(app.config['REDIS_URL'])
-app.queue = rq.Queue('policy-handler', connection=app.redis, default_timeout=3600)
-app.logger.setLevel(logging.DEBUG)
+def create_app(config_class=Config):
+    # application factory, only Flask, Redis, and the database are set up here, the evaluation modules importing
+    # braket, qiskit, and numpy are loaded by the views on first use
+    application = Flask(__name__)
+    application.config.from_object(config_class)
+    db.init_app(application)
+    migrate.init_app(application, db)
+
+    application.redis = Redis.from_url(application.config['REDIS_URL'])
+    application.queue = rq.Queue('policy-handler', connection=application.redis, default_timeout=3600)
+    application.refresher_queue = rq.Queue('policy-handler-refresher', connection=application.redis)
+    application.logger.setLevel(logging.DEBUG)
+
+    from app import errors, refresher, result_model, routes
+    application.register_blueprint(routes.blueprint)
+    application.register_blueprint(errors.blueprint)
+    application.register_blueprint(refresher.blueprint)
+    return application
+
+
+# default application of gunicorn (policy-handler:app), the rq worker, and the flask CLI, the modules of the package
+# use the current application instead
+app = create_app()
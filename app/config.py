@@ -28,4 +28,79 @@ class Config(object):
 
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(basedir, 'files')
-    RESULT_FOLDER = os.environ.get('RESULT_FOLDER') or os.path.join(basedir, 'generated-files')
\ No newline at end of file
+    RESULT_FOLDER = os.environ.get('RESULT_FOLDER') or os.path.join(basedir, 'generated-files')
+
+    # time in seconds the device catalog of each provider is served from the cache before it is revalidated
+    DEVICE_CACHE_TTL_AWS = int(os.environ.get('DEVICE_CACHE_TTL_AWS') or 300)
+    DEVICE_CACHE_TTL_IBM = int(os.environ.get('DEVICE_CACHE_TTL_IBM') or 300)
+    # additional time in seconds an expired catalog is still served while it is refreshed in the background
+    DEVICE_CACHE_STALE_TTL = int(os.environ.get('DEVICE_CACHE_STALE_TTL') or 3600)
+
+    # number of threads used to fetch device properties concurrently during the discovery
+    DISCOVERY_MAX_WORKERS = int(os.environ.get('DISCOVERY_MAX_WORKERS') or 8)
+    # time in seconds to wait for the devices of a provider before the evaluation continues without them
+    DISCOVERY_TIMEOUT_AWS = float(os.environ.get('DISCOVERY_TIMEOUT_AWS') or 60)
+    DISCOVERY_TIMEOUT_IBM = float(os.environ.get('DISCOVERY_TIMEOUT_IBM') or 60)
+    # time in seconds the number of pending jobs of an IBMQ backend is reused before it is polled again
+    QUEUE_DEPTH_TTL = int(os.environ.get('QUEUE_DEPTH_TTL') or 30)
+    # maximum number of programs whose shot analysis is kept in the cache
+    SHOT_ANALYSIS_CACHE_SIZE = int(os.environ.get('SHOT_ANALYSIS_CACHE_SIZE') or 10000)
+    # number of processes analyzing the programs of a workflow in parallel, each gunicorn worker has its own processes,
+    # and time in seconds to wait for the programs of a workflow
+    SHOT_ANALYSIS_PROCESSES = int(os.environ.get('SHOT_ANALYSIS_PROCESSES') or 2)
+    SHOT_ANALYSIS_TIMEOUT = float(os.environ.get('SHOT_ANALYSIS_TIMEOUT') or 60)
+
+    # limits for the inspection of uploaded archives including all nested archives
+    ZIP_MAX_MEMBERS = int(os.environ.get('ZIP_MAX_MEMBERS') or 10000)
+    ZIP_MAX_UNCOMPRESSED_SIZE = int(os.environ.get('ZIP_MAX_UNCOMPRESSED_SIZE') or 100 * 1024 * 1024)
+    ZIP_MAX_DEPTH = int(os.environ.get('ZIP_MAX_DEPTH') or 5)
+
+    # key to encrypt the credentials of asynchronous evaluations in the jobs of the rq worker, can be generated using
+    # cryptography.fernet.Fernet.generate_key() and has to be set for the policy handler and the rq worker
+    JOB_CREDENTIALS_KEY = os.environ.get('JOB_CREDENTIALS_KEY')
+
+    # maximum number of credentials with authenticated provider sessions and time in seconds an unused session is kept
+    SESSION_POOL_SIZE = int(os.environ.get('SESSION_POOL_SIZE') or 64)
+    SESSION_POOL_IDLE_TIMEOUT = float(os.environ.get('SESSION_POOL_IDLE_TIMEOUT') or 1800)
+
+    # implementation of the providers, 'cloud' for Amazon Braket and IBMQ or 'fake' for synthetic devices
+    PROVIDER = os.environ.get('PROVIDER') or 'cloud'
+    # number of synthetic devices, delay in seconds and probability of a failure of each call of the fake provider
+    FAKE_PROVIDER_AWS_DEVICES = int(os.environ.get('FAKE_PROVIDER_AWS_DEVICES') or 500)
+    FAKE_PROVIDER_IBM_BACKENDS = int(os.environ.get('FAKE_PROVIDER_IBM_BACKENDS') or 100)
+    FAKE_PROVIDER_LATENCY = float(os.environ.get('FAKE_PROVIDER_LATENCY') or 0)
+    FAKE_PROVIDER_FAILURE_RATE = float(os.environ.get('FAKE_PROVIDER_FAILURE_RATE') or 0)
+    FAKE_PROVIDER_SEED = int(os.environ.get('FAKE_PROVIDER_SEED') or 0)
+
+    # profiling of single requests via the X-Policy-Handler-Profile header or the profile query parameter, which must
+    # contain PROFILING_TOKEN if it is set, the PROFILING_MAX_PROFILES most recent profiles are kept
+    PROFILING_ENABLED = (os.environ.get('PROFILING_ENABLED') or 'false').lower() == 'true'
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES') or 100)
+
+    # maximum size in bytes of all stored uploads and time in seconds after which an unused upload is removed, uploads
+    # used within the grace period are never removed, the upload folder is checked at most once per interval
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE') or 1024 * 1024 * 1024)
+    UPLOAD_MAX_AGE = float(os.environ.get('UPLOAD_MAX_AGE') or 7 * 24 * 3600)
+    UPLOAD_EVICTION_GRACE = float(os.environ.get('UPLOAD_EVICTION_GRACE') or 3600)
+    UPLOAD_EVICTION_INTERVAL = float(os.environ.get('UPLOAD_EVICTION_INTERVAL') or 60)
+
+    # time in seconds the result of an evaluation is reused for identical requests, evaluations depending on the queue
+    # sizes of the IBMQ backends expire earlier, a result is invalidated if the catalogs it was computed from change
+    DECISION_CACHE_TTL = int(os.environ.get('DECISION_CACHE_TTL') or 3600)
+    DECISION_CACHE_TTL_QUEUE_DEPTH = int(os.environ.get('DECISION_CACHE_TTL_QUEUE_DEPTH') or 30)
+
+    # time in seconds a request waits for an identical evaluation in progress before it evaluates the request itself
+    SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT') or 300)
+
+    # the device refresher on the rq worker keeps the catalog of Amazon Braket and the queue sizes of the IBMQ backends
+    # in Redis up to date using the given credentials, the requests then do not query the providers for them
+    DEVICE_REFRESHER_ENABLED = (os.environ.get('DEVICE_REFRESHER_ENABLED') or 'false').lower() == 'true'
+    REFRESHER_IBMQ_TOKEN = os.environ.get('REFRESHER_IBMQ_TOKEN')
+    REFRESHER_AWS_ACCESS_KEY = os.environ.get('REFRESHER_AWS_ACCESS_KEY')
+    REFRESHER_AWS_SECRET_ACCESS_KEY = os.environ.get('REFRESHER_AWS_SECRET_ACCESS_KEY')
+    # bounds of the interval in seconds, the interval is shortened while the values change and extended otherwise
+    REFRESH_INTERVAL_MIN_AWS_CATALOG = float(os.environ.get('REFRESH_INTERVAL_MIN_AWS_CATALOG') or 60)
+    REFRESH_INTERVAL_MAX_AWS_CATALOG = float(os.environ.get('REFRESH_INTERVAL_MAX_AWS_CATALOG') or 900)
+    REFRESH_INTERVAL_MIN_QUEUE_DEPTH = float(os.environ.get('REFRESH_INTERVAL_MIN_QUEUE_DEPTH') or 10)
+    REFRESH_INTERVAL_MAX_QUEUE_DEPTH = float(os.environ.get('REFRESH_INTERVAL_MAX_QUEUE_DEPTH') or 120)
\ No newline at end of file
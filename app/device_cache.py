@@ -0,0 +1,206 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+import threading
+import time
+
+from redis.exceptions import RedisError
+from flask import current_app
+
+from app import metrics
+from app.device_descriptor import DeviceDescriptor
+
+# all keys of the device catalog cache live in the Redis instance shared by the gunicorn and rq workers
+CACHE_PREFIX = 'policy-handler:device-cache'
+STATS_KEY = CACHE_PREFIX + ':stats'
+# the hash of the devices of each catalog is stored next to it, results derived from a catalog are only reused for
+# the same version
+VERSION_SUFFIX = ':version'
+
+# version of the format of the records, which are the lists of DeviceDescriptor.as_list()
+CATALOG_FORMAT = 'v2'
+
+# time in seconds a worker may spend on refreshing an expired catalog before another worker takes over
+REFRESH_LOCK_TIMEOUT = 120
+
+
+def serialize_aws_device(device):
+    # only gate-based QPUs and simulators are contained in the catalog, AwsDevice parses its properties on every access
+    properties = device.properties
+    summary = properties.service.deviceDocumentation.summary
+    if 'gate-model' not in summary and 'simulator' not in summary:
+        return None
+    return DeviceDescriptor.from_aws_device(device, properties).as_list()
+
+
+def serialize_ibm_backend(backend):
+    return DeviceDescriptor.from_ibm_backend(backend).as_list()
+
+
+def get_aws_devices(scope, loader):
+    # the catalog of Amazon Braket does not depend on the credentials, thus, all requests of a provider share one entry
+    from app.policy_evaluation import pricing
+
+    devices = [DeviceDescriptor.from_list(record) for record in get_catalog('aws', scope, _aws_catalog(loader))]
+    for device in devices:
+        # the price matrices are reused as long as the prices of the devices do not change
+        device.pricing = pricing.register(device.arn, device.pricing.as_list())
+    return devices
+
+
+def refresh_aws_devices(scope, loader):
+    # used by the device refresher (see app.refresher) to replace the catalog regardless of its age
+    return _refresh('aws', _catalog_key('aws', scope), _aws_catalog(loader))
+
+
+def get_ibm_backends(scope, loader):
+    # the available backends depend on the IBMQ account, only the fingerprint of the token is written to Redis
+    records = get_catalog('ibm', scope, lambda: [serialize_ibm_backend(backend) for backend in loader()])
+    return [DeviceDescriptor.from_list(record) for record in records]
+
+
+def get_catalog(provider, scope, loader):
+    key = _catalog_key(provider, scope)
+    ttl = _ttl(provider)
+    try:
+        entry = current_app.redis.get(key)
+    except RedisError as e:
+        current_app.logger.warning('Device cache unavailable, loading ' + provider + ' catalog directly: ' + str(e))
+        return loader()
+
+    if entry is None:
+        _count(provider, 'miss')
+        return _refresh(provider, key, loader)
+
+    entry = json.loads(entry)
+    age = time.time() - entry['fetchedAt']
+    if age < ttl:
+        _count(provider, 'hit')
+    elif _refreshed_by_worker(provider):
+        # the device refresher replaces the catalog, the requests never query the provider for an existing catalog
+        _count(provider, 'stale')
+    else:
+        # stale-while-revalidate: serve the expired catalog and let exactly one worker refresh it
+        _count(provider, 'stale')
+        if current_app.redis.set(key + ':lock', 1, nx=True, ex=REFRESH_LOCK_TIMEOUT):
+            current_app.logger.info('Device catalog of ' + provider + ' is stale since ' + str(int(age - ttl)) +
+                                    's, refreshing in background')
+            threading.Thread(target=_refresh_in_background,
+                             args=(current_app._get_current_object(), provider, key, loader), daemon=True).start()
+    return entry['devices']
+
+
+def invalidate(provider=None):
+    pattern = CACHE_PREFIX + ':' + (provider or '*') + ':*'
+    keys = list(current_app.redis.scan_iter(match=pattern))
+    if keys:
+        current_app.redis.delete(*keys)
+    current_app.logger.info('Invalidated ' + str(len(keys)) + ' device cache entries')
+    return len(keys)
+
+
+def ibm_backend_names():
+    # names of the backends in the IBMQ catalogs of all accounts
+    names = set()
+    for key in current_app.redis.scan_iter(match=_catalog_key('ibm', '*')):
+        if key.endswith(b':lock') or key.endswith(VERSION_SUFFIX.encode('utf-8')):
+            continue
+        entry = current_app.redis.get(key)
+        if entry is not None:
+            names.update(DeviceDescriptor.from_list(record).name for record in json.loads(entry)['devices'])
+    return sorted(names)
+
+
+def cache_stats():
+    stats = {}
+    for field, value in current_app.redis.hgetall(STATS_KEY).items():
+        provider, kind = field.decode('utf-8').split(':')
+        stats.setdefault(provider, {'hit': 0, 'stale': 0, 'miss': 0})[kind] = int(value)
+    for counters in stats.values():
+        requests = counters['hit'] + counters['stale'] + counters['miss']
+        counters['hitRatio'] = (counters['hit'] + counters['stale']) / requests if requests else 0.0
+    return stats
+
+
+def catalog_version(provider, scope):
+    # hash of the devices of the catalog, None if the catalog is not cached or Redis is unavailable
+    try:
+        version = current_app.redis.get(_catalog_key(provider, scope) + VERSION_SUFFIX)
+    except RedisError:
+        return None
+    return version.decode('utf-8') if version is not None else None
+
+
+def _refresh(provider, key, loader):
+    devices = loader()
+    entry = json.dumps({'fetchedAt': time.time(), 'devices': devices})
+    version = hashlib.sha256(json.dumps(devices, sort_keys=True).encode('utf-8')).hexdigest()
+    try:
+        # keep the entry in Redis for the stale period as well so that it can be served during revalidation
+        expiration = _ttl(provider) + current_app.config['DEVICE_CACHE_STALE_TTL']
+        pipeline = current_app.redis.pipeline()
+        pipeline.set(key, entry, ex=expiration)
+        pipeline.set(key + VERSION_SUFFIX, version, ex=expiration)
+        pipeline.execute()
+    except RedisError as e:
+        current_app.logger.warning('Unable to store ' + provider + ' catalog in device cache: ' + str(e))
+    return devices
+
+
+def _refresh_in_background(application, provider, key, loader):
+    # the thread outlives the request, thus, it pushes its own application context
+    with application.app_context():
+        try:
+            _refresh(provider, key, loader)
+        except Exception as e:
+            metrics.count_provider_error(provider, 'refresh')
+            current_app.logger.error('Refreshing ' + provider + ' device catalog failed: ' + str(e))
+        finally:
+            current_app.redis.delete(key + ':lock')
+
+
+def _aws_catalog(loader):
+    return lambda: [record for record in map(serialize_aws_device, loader()) if record is not None]
+
+
+def _catalog_key(provider, scope):
+    # the catalogs of the previous format stored the complete device properties
+    return CACHE_PREFIX + ':' + provider + ':' + CATALOG_FORMAT + ':' + scope
+
+
+def _refreshed_by_worker(provider):
+    # the refresher only knows the catalog of Amazon Braket, the IBMQ catalogs depend on the accounts of the requests,
+    # if the refresher stopped, e.g., as its worker was killed, the requests revalidate the catalog again
+    from app import refresher
+
+    return provider == 'aws' and current_app.config['DEVICE_REFRESHER_ENABLED'] and refresher.is_running('aws-catalog')
+
+
+def _ttl(provider):
+    return current_app.config['DEVICE_CACHE_TTL_' + provider.upper()]
+
+
+def _count(provider, kind):
+    metrics.count_cache('device-' + provider, kind)
+    try:
+        current_app.redis.hincrby(STATS_KEY, provider + ':' + kind, 1)
+    except RedisError:
+        pass
@@ -0,0 +1,89 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+from app.execution_windows import ALWAYS_AVAILABLE, WeeklyAvailability, compile_execution_windows
+
+# values of DeviceDescriptor.type, equal to the values of AwsDeviceType
+QPU = 'QPU'
+SIMULATOR = 'SIMULATOR'
+
+# provider of the IBMQ backends, the AWS devices use the provider name of Amazon Braket, e.g., 'IonQ'
+IBM_PROVIDER = 'IBM'
+
+
+class DeviceDescriptor(object):
+    # compact description of a device with the values used during the evaluation, which replaces the objects of the
+    # SDKs holding clients and the complete device properties. Descriptors are stored in the device catalogs as
+    # as_list() and can be pickled, e.g., into rq jobs
+    __slots__ = ('name', 'arn', 'provider', 'type', 'pricing', 'windows')
+
+    def __init__(self, name, arn=None, provider=IBM_PROVIDER, device_type=QPU, pricing=None,
+                 windows=ALWAYS_AVAILABLE):
+        self.name = name
+        # None for IBMQ backends
+        self.arn = arn
+        self.provider = provider
+        self.type = device_type
+        # PricingModel of AWS devices, None for IBMQ backends
+        self.pricing = pricing
+        # weekly bitmap of the execution windows (see app.execution_windows)
+        self.windows = windows
+
+    @classmethod
+    def from_aws_device(cls, device, properties=None):
+        # AwsDevice parses its properties on every access, thus, they can be passed if they were already retrieved
+        from app.policy_evaluation.pricing import PricingModel
+
+        if properties is None:
+            properties = device.properties
+        return cls(device.name, device.arn, device.provider_name, device.type.value,
+                   PricingModel.from_properties(properties),
+                   compile_execution_windows(properties.service.executionWindows))
+
+    @classmethod
+    def from_ibm_backend(cls, backend):
+        return cls(backend.name(), device_type=SIMULATOR if backend.configuration().simulator else QPU)
+
+    @classmethod
+    def from_list(cls, values):
+        from app.policy_evaluation.pricing import PricingModel
+
+        name, arn, provider, device_type, prices, windows = values
+        return cls(name, arn, provider, device_type, PricingModel(*prices) if prices is not None else None,
+                   int(windows, 16))
+
+    def as_list(self):
+        # the bitmap of the windows exceeds 64 bits, which most JSON parsers do not support, thus, it is stored as
+        # hexadecimal string
+        return [self.name, self.arn, self.provider, self.type,
+                self.pricing.as_list() if self.pricing is not None else None, format(self.windows, 'x')]
+
+    @property
+    def execution_windows(self):
+        return WeeklyAvailability(self.windows)
+
+    def __eq__(self, other):
+        return isinstance(other, DeviceDescriptor) and (self.arn, self.name) == (other.arn, other.name)
+
+    def __hash__(self):
+        return hash((self.arn, self.name))
+
+    def __repr__(self):
+        return 'Device(\'name\': {}, \'arn\': {})'.format(self.name, self.arn)
+
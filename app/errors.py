@@ -17,20 +17,21 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from flask import make_response, jsonify
-from app import app
+from flask import Blueprint, make_response, jsonify
 
+blueprint = Blueprint('errors', __name__)
 
-@app.errorhandler(500)
+
+@blueprint.app_errorhandler(500)
 def internal_server(error):
     return make_response(jsonify({'error': 'Internal Server Error', 'statusCode': '500'}), 500)
 
 
-@app.errorhandler(404)
+@blueprint.app_errorhandler(404)
 def not_found(error):
     return make_response(jsonify({'error': 'Not found', 'statusCode': '404'}), 404)
 
 
-@app.errorhandler(400)
+@blueprint.app_errorhandler(400)
 def bad_request(error):
     return make_response(jsonify({'error': 'Bad Request', 'statusCode': '400'}), 400)
@@ -0,0 +1,193 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import json
+
+import numpy as np
+
+from app import metrics
+from app.device_descriptor import SIMULATOR
+from app.policy_evaluation import decision_cache
+from app.policy_evaluation.availability_evaluation import evaluate_availability_aws, \
+    evaluate_availability_qiskit
+from app.utils import add_devices_for_evaluation, authenticate
+from app.policy_evaluation.privacy_evaluation import privacy_factors_aws
+from app.policy_evaluation.money_evaluation import calculate_costs
+from app.policy_evaluation.ranking import rank_devices, to_list
+from app.policy_evaluation.scoring import build_criteria_matrix, score_matrix
+
+# names of the policies of a policy set, as used in the form of the design time evaluation
+POLICY_NAMES = ('moneyPolicy', 'privacyPolicy', 'availabilityPolicy', 'customEnvironmentPolicy')
+
+
+class PolicySet(object):
+    # weights of one combination of money, privacy, availability, and custom environment policy
+
+    def __init__(self, money_policy, privacy_policy, availability_policy, custom_environment_policy):
+        # if this policy is specified the execution of the programs require a customized docker environment
+        # since Qiskit Runtime does not allow this, only devices from AWS are included in the selection
+        self.custom_environment_policy_set = len(custom_environment_policy) > 1 or len(money_policy) > 1
+        self.simulators_allowed = not self.custom_environment_policy_set
+        self.money_policy_set = len(money_policy) == 1
+        self.availability_policy_set = len(availability_policy) == 1
+        self.privacy_policy_set = len(privacy_policy) == 1
+        self.money_policy = money_policy
+
+        self.money_policy_weight = money_policy['moneyPolicy']['weight'] if self.money_policy_set else 0
+        self.availability_policy_weight = availability_policy['availabilityPolicy']['weight'] \
+            if self.availability_policy_set else 0
+        self.privacy_policy_weight = privacy_policy['privacyPolicy']['weight'] if self.privacy_policy_set else 0
+        # the design time evaluation applies the privacy policy of AWS to the IBMQ backends as well
+        self.data_retention, self.third_party_qpu = privacy_factors_aws(privacy_policy) \
+            if self.privacy_policy_set else (0, 0)
+
+    @classmethod
+    def from_json(cls, policy_set):
+        # policies which are not contained in the policy set are not applied
+        return cls(*[policy_set.get(name) or {} for name in POLICY_NAMES])
+
+    @property
+    def qiskit_allowed(self):
+        return not self.custom_environment_policy_set and not self.money_policy_set
+
+    @property
+    def privacy_score(self):
+        # both privacy criteria have the same value for all devices and are weighted with the privacy weight
+        return self.privacy_policy_weight * (self.data_retention + self.third_party_qpu)
+
+    @property
+    def queue_depth_dependent(self):
+        # the availability of the IBMQ backends is determined by their queue sizes
+        return self.qiskit_allowed and self.availability_policy_set
+
+    def normalized(self):
+        # all values which influence the evaluation, e.g., to detect identical evaluations, the money policy does
+        # not contain anything but the weight
+        return [self.custom_environment_policy_set, self.money_policy_set, self.availability_policy_set,
+                self.privacy_policy_set, self.money_policy_weight, self.availability_policy_weight,
+                self.privacy_policy_weight, self.data_retention, self.third_party_qpu]
+
+
+def evaluate_design_time(ibmq_token, aws_access_key, aws_secret_access_key, money_policy, privacy_policy,
+                         availability_policy, custom_environment_policy, program_source, k=None):
+    # executed within the request or by the rq worker for asynchronous evaluations, thus, all input is passed
+    # explicitly instead of reading it from the request. If k is given, the k best devices of each runtime are
+    # returned instead of only the best one.
+    policy_set = PolicySet(money_policy, privacy_policy, availability_policy, custom_environment_policy)
+    evaluation = evaluate_policy_sets(ibmq_token, aws_access_key, aws_secret_access_key, [policy_set],
+                                      program_source, k)[0]
+    # the runtime is returned as plain text as before
+    return evaluation if isinstance(evaluation, str) else json.dumps(evaluation)
+
+
+@metrics.timed('evaluation')
+def evaluate_policy_sets(ibmq_token, aws_access_key, aws_secret_access_key, policy_sets, program_source, k=None):
+    # identical evaluations, e.g., repeated refreshes of the modeler, are answered from the decision cache, the
+    # session is used for the key and the evaluation, set to any region which supports Amazon Braket
+    session = authenticate(ibmq_token, aws_access_key, aws_secret_access_key, 'us-east-1')
+
+    def evaluation_key():
+        return decision_cache.evaluation_key(session, (ibmq_token, aws_access_key, aws_secret_access_key),
+                                             policy_sets, program_source, k)
+
+    return decision_cache.cached_evaluation(evaluation_key, policy_sets,
+                                            lambda: compute_evaluations(session, policy_sets, program_source, k))
+
+
+def compute_evaluations(session, policy_sets, program_source, k=None):
+    # evaluates several policy sets against one snapshot of the devices: the devices are discovered, their costs and
+    # availability are computed only once, and all policy sets are scored with a single matrix product
+
+    # compute all devices from each provider, simulators are excluded afterwards for the policy sets not allowing them
+    qiskit_required = any(policy_set.qiskit_allowed for policy_set in policy_sets)
+    aws_devices, backends = add_devices_for_evaluation(session, True, not qiskit_required)
+
+    money_policy_sets = [policy_set for policy_set in policy_sets if policy_set.money_policy_set]
+    if money_policy_sets:
+        # the costs depend on the programs only, the money policy merely provides the weight
+        money_policy_result = calculate_costs(aws_devices, money_policy_sets[0].money_policy, program_source)
+    else:
+        money_policy_result = [0] * len(aws_devices)
+
+    # get queue size for ibm devices
+    # get execution window for aws devices
+    if any(policy_set.availability_policy_set for policy_set in policy_sets):
+        availability_policy_result_aws = evaluate_availability_aws(aws_devices)
+        availability_policy_result_qiskit = evaluate_availability_qiskit(backends, session)
+    else:
+        availability_policy_result_aws = [0] * len(aws_devices)
+        availability_policy_result_qiskit = [0] * len(backends)
+
+    # Ranking: devices x (cost, availability, privacy) times (cost, availability, privacy) x policy sets
+    matrix = build_criteria_matrix([money_policy_result, availability_policy_result_aws, [1] * len(aws_devices)])
+    scores = score_matrix(matrix, [[policy_set.money_policy_weight for policy_set in policy_sets],
+                                   [policy_set.availability_policy_weight for policy_set in policy_sets],
+                                   [policy_set.privacy_score for policy_set in policy_sets]])
+    qiskit_matrix = build_criteria_matrix([availability_policy_result_qiskit, [1] * len(backends)])
+    scores_qiskit = score_matrix(qiskit_matrix, [[policy_set.availability_policy_weight for policy_set in policy_sets],
+                                                 [policy_set.privacy_score for policy_set in policy_sets]])
+    simulators = np.array([device.type == SIMULATOR for device in aws_devices[:len(matrix)]],
+                          dtype=bool)
+
+    evaluations = []
+    for column, policy_set in enumerate(policy_sets):
+        selected = np.flatnonzero(~simulators) if not policy_set.simulators_allowed else np.arange(len(matrix))
+        aws_ranking = rank_devices([aws_devices[index] for index in selected], {
+            'cost': criterion(matrix[selected, 0], policy_set.money_policy_set),
+            'availability': criterion(matrix[selected, 1], policy_set.availability_policy_set),
+            'dataRetention': [policy_set.data_retention] * len(selected),
+            'thirdPartyQPU': [policy_set.third_party_qpu] * len(selected)}, scores[selected, column].tolist(), k or 1)
+        rankings = {'AWS Runtime': aws_ranking}
+        runtime = 'AWS Runtime'
+        if policy_set.qiskit_allowed:
+            rankings['Qiskit Runtime'] = rank_devices(backends, {
+                'availability': criterion(qiskit_matrix[:, 0], policy_set.availability_policy_set),
+                'dataRetention': [policy_set.data_retention] * len(qiskit_matrix),
+                'thirdPartyQPU': [policy_set.third_party_qpu] * len(qiskit_matrix)},
+                scores_qiskit[:, column].tolist(), k or 1)
+            runtime = compare_runtimes(scores[selected, column], scores_qiskit[:, column])
+            if k is None:
+                evaluations.append(runtime)
+                continue
+
+        if k is None:
+            evaluations.append(["AWS Runtime"] + to_list(aws_ranking[0]) if aws_ranking else [])
+        else:
+            # top-k devices of each runtime with the values of all criteria, e.g., to select fallbacks
+            evaluations.append({'runtime': runtime, 'rankings': rankings})
+    return evaluations
+
+
+def criterion(values, policy_set):
+    # values of a criterion whose policy is not part of the policy set are reported as 0
+    return values.tolist() if policy_set else [0] * len(values)
+
+
+def compare_runtimes(scores, scores_qiskit):
+    # the runtime with the higher minimal score is selected, the runtime with devices wins if the other has none,
+    # devices with a NaN score are not ranked
+    scores = scores[~np.isnan(scores)]
+    scores_qiskit = scores_qiskit[~np.isnan(scores_qiskit)]
+    if len(scores) == 0 or len(scores_qiskit) == 0:
+        return 'Qiskit Runtime' if len(scores_qiskit) else 'AWS Runtime'
+    if scores_qiskit.min() > scores.min():
+        return "Qiskit Runtime"
+    if scores_qiskit.min() < scores.min():
+        return "AWS Runtime"
+    return "Tie"
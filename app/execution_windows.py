@@ -0,0 +1,94 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import datetime
+from functools import lru_cache
+
+import pytz
+
+# the execution windows of a device are compiled into a bitmap with one bit per hour of the week (in UTC),
+# bit 0 corresponds to Monday 00:00-01:00 and bit 167 to Sunday 23:00-24:00
+HOURS_PER_WEEK = 168
+ALWAYS_AVAILABLE = (1 << HOURS_PER_WEEK) - 1
+
+EXECUTION_DAYS = {
+    'Everyday': range(7),
+    'Weekdays': range(5),
+    'Weekend': (5, 6),
+    'Monday': (0,),
+    'Tuesday': (1,),
+    'Wednesday': (2,),
+    'Thursday': (3,),
+    'Friday': (4,),
+    'Saturday': (5,),
+    'Sunday': (6,)
+}
+
+
+def compile_execution_windows(execution_windows):
+    bitmap = 0
+    for execution_window in execution_windows:
+        start_hour = execution_window.windowStartHour.hour
+        end_time = execution_window.windowEndHour
+        # windows ending within an hour, e.g., at 23:59:59, also cover this hour
+        end_hour = end_time.hour + (1 if end_time.minute or end_time.second else 0)
+        if end_hour < start_hour:
+            # the window ends on the next day
+            end_hour += 24
+        for day in EXECUTION_DAYS[execution_window.executionDay.value]:
+            for hour in range(start_hour, end_hour):
+                bitmap |= 1 << ((day * 24 + hour) % HOURS_PER_WEEK)
+    return bitmap
+
+
+def current_slot(current_time=None):
+    # slot of the bitmap corresponding to the current hour of the week in UTC (time zone used in Amazon Braket)
+    if current_time is None:
+        current_time = datetime.datetime.now(tz=pytz.UTC)
+    return current_time.weekday() * 24 + current_time.hour
+
+
+class WeeklyAvailability(object):
+    __slots__ = ('bitmap', '_remaining_hours')
+
+    def __init__(self, bitmap):
+        self.bitmap = bitmap
+        self._remaining_hours = _compute_remaining_hours(bitmap)
+
+    def is_available(self, slot):
+        return bool(self.bitmap >> slot & 1)
+
+    def remaining_hours(self, slot):
+        # number of hours until the window containing the given slot closes, 0 if there is no such window
+        return self._remaining_hours[slot]
+
+
+@lru_cache(maxsize=256)
+def _compute_remaining_hours(bitmap):
+    # devices usually share the same few windows, thus, the table is only computed once per distinct bitmap
+    if bitmap == ALWAYS_AVAILABLE:
+        return bytes([HOURS_PER_WEEK] * HOURS_PER_WEEK)
+
+    remaining_hours = [0] * HOURS_PER_WEEK
+    run = 0
+    # walk backwards over two weeks so that windows spanning from Sunday to Monday are counted completely
+    for slot in reversed(range(2 * HOURS_PER_WEEK)):
+        run = run + 1 if bitmap >> (slot % HOURS_PER_WEEK) & 1 else 0
+        remaining_hours[slot % HOURS_PER_WEEK] = run
+    return bytes(remaining_hours)
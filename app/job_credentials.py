@@ -0,0 +1,56 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import json
+
+from flask import current_app
+
+# arguments of the evaluation which are not written to the job hash in Redis in plain text
+CREDENTIAL_ARGUMENTS = ('ibmq_token', 'aws_access_key', 'aws_secret_access_key')
+SEALED_ARGUMENT = 'sealed_credentials'
+
+
+def seal(evaluation_input):
+    # returns the arguments of the job with the credentials encrypted by JOB_CREDENTIALS_KEY, which is shared by the
+    # policy handler and the rq worker, without a key the credentials are passed in plain text
+    key = current_app.config['JOB_CREDENTIALS_KEY']
+    if not key:
+        current_app.logger.warning('JOB_CREDENTIALS_KEY is not set, credentials are passed to the rq worker in plain '
+                                   'text')
+        return evaluation_input
+
+    from cryptography.fernet import Fernet
+
+    job_input = dict(evaluation_input)
+    credentials = {name: job_input.pop(name) for name in CREDENTIAL_ARGUMENTS}
+    job_input[SEALED_ARGUMENT] = Fernet(key).encrypt(json.dumps(credentials).encode('utf-8'))
+    return job_input
+
+
+def unseal(job_input):
+    # returns the arguments of the evaluation, executed by the rq worker
+    if SEALED_ARGUMENT not in job_input:
+        return job_input
+
+    from cryptography.fernet import Fernet
+
+    evaluation_input = dict(job_input)
+    sealed = evaluation_input.pop(SEALED_ARGUMENT)
+    credentials = Fernet(current_app.config['JOB_CREDENTIALS_KEY']).decrypt(sealed)
+    evaluation_input.update(json.loads(credentials.decode('utf-8')))
+    return evaluation_input
@@ -0,0 +1,124 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import contextvars
+import functools
+import glob
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+# the gunicorn workers and the rq workers write their metrics into PROMETHEUS_MULTIPROC_DIR, which has to be set
+# before this module is imported and emptied before the processes are started, the metrics endpoint of any worker then
+# aggregates the values of all processes writing to this folder and to the comma-separated PROMETHEUS_MULTIPROC_DIRS,
+# e.g., the folder of the rq worker in another container
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+AGGREGATED_DIRS = [path for path in (os.environ.get('PROMETHEUS_MULTIPROC_DIRS') or '').split(',') if path]
+
+# from milliseconds for the ranking up to the discovery timeouts
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_DURATION = Histogram('policy_handler_stage_duration_seconds', 'Duration of the stages of the evaluation',
+                           ['stage'], buckets=DURATION_BUCKETS)
+REQUEST_DURATION = Histogram('policy_handler_request_duration_seconds', 'Duration of the HTTP requests',
+                             ['endpoint', 'method', 'status'], buckets=DURATION_BUCKETS)
+CACHE_REQUESTS = Counter('policy_handler_cache_requests', 'Lookups in the caches by result', ['cache', 'result'])
+PROVIDER_ERRORS = Counter('policy_handler_provider_errors', 'Failed or timed out calls of the providers',
+                          ['provider', 'error'])
+COALESCED_REQUESTS = Counter('policy_handler_coalesced_requests',
+                             'Requests which got the result of an identical evaluation in progress', ['scope'])
+
+
+# trace of the stages of a profiled request, propagated to other threads by running them in a copy of the context
+_trace = contextvars.ContextVar('trace', default=None)
+
+
+class Trace(object):
+    # spans of the stages executed while the trace is active
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, stage, started, duration):
+        self.spans.append({'stage': stage, 'thread': threading.current_thread().name,
+                           'start': started - self.started, 'duration': duration})
+
+
+def timed(stage):
+    # decorator recording the duration of each call of the function as the given stage, also if it fails
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - started
+                STAGE_DURATION.labels(stage).observe(duration)
+                trace = _trace.get()
+                if trace is not None:
+                    trace.add(stage, started, duration)
+        return wrapper
+    return decorator
+
+
+def start_trace():
+    # returns the token to stop the trace, the trace is also active in threads which run in a copy of the context
+    return _trace.set(Trace())
+
+
+def stop_trace(token):
+    trace = _trace.get()
+    _trace.reset(token)
+    return trace
+
+
+def count_cache(cache, result, amount=1):
+    if amount:
+        CACHE_REQUESTS.labels(cache, result).inc(amount)
+
+
+def count_provider_error(provider, error):
+    PROVIDER_ERRORS.labels(provider, error).inc()
+
+
+def count_coalesced(scope):
+    # scope is 'worker' if the evaluation ran in the same process and 'redis' if it ran in another worker
+    COALESCED_REQUESTS.labels(scope).inc()
+
+
+def render():
+    # returns the metrics in the Prometheus text format and the corresponding content type
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        registry.register(_MultiProcessCollector())
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class _MultiProcessCollector(object):
+    # like multiprocess.MultiProcessCollector, but the values are merged over the files of all folders
+    def collect(self):
+        from prometheus_client import multiprocess
+        paths = [os.environ['PROMETHEUS_MULTIPROC_DIR']] + AGGREGATED_DIRS
+        files = [name for path in paths for name in glob.glob(os.path.join(path, '*.db'))]
+        return multiprocess.MultiProcessCollector.merge(files, accumulate=True)
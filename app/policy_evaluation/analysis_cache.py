@@ -0,0 +1,105 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+import time
+
+from redis.exceptions import RedisError
+from flask import current_app
+
+from app import metrics
+from app.policy_evaluation.shot_analyzer import ANALYZER_VERSION, ShotCounts, analyze_shots
+
+# results are stored by the hash of the program, changing the analyzer version invalidates all entries
+CACHE_PREFIX = 'policy-handler:shot-analysis'
+ENTRY_PREFIX = CACHE_PREFIX + ':v' + str(ANALYZER_VERSION) + ':'
+# sorted set with the time of the last access per entry, used for the LRU eviction
+ACCESS_KEY = CACHE_PREFIX + ':access'
+STATS_KEY = CACHE_PREFIX + ':stats'
+
+
+def program_hash(source):
+    return hashlib.sha256(source).hexdigest()
+
+
+def analyze_entry(source, filename='<program>'):
+    # programs which require a runtime evaluation are cached as well to avoid parsing them again
+    try:
+        return {'counts': analyze_shots(source, filename).as_tuple()}
+    except ValueError as e:
+        return {'error': str(e)}
+
+
+def counts_from_entry(entry):
+    if 'error' in entry:
+        raise ValueError(entry['error'])
+    return ShotCounts.from_tuple(entry['counts'])
+
+
+def lookup(digest):
+    key = ENTRY_PREFIX + digest
+    try:
+        entry = current_app.redis.get(key)
+    except RedisError as e:
+        current_app.logger.warning('Shot analysis cache unavailable: ' + str(e))
+        return None
+    if entry is None:
+        return None
+    _record_access(key, 'hit')
+    return json.loads(entry)
+
+
+def store(digest, entry):
+    key = ENTRY_PREFIX + digest
+    try:
+        _record_access(key, 'miss')
+        current_app.redis.set(key, json.dumps(entry))
+
+        # evict the least recently used entries if the cache exceeds its size
+        overflow = current_app.redis.zcard(ACCESS_KEY) - current_app.config['SHOT_ANALYSIS_CACHE_SIZE']
+        if overflow > 0:
+            evicted = [evicted_key for evicted_key, _ in current_app.redis.zpopmin(ACCESS_KEY, overflow)]
+            current_app.redis.delete(*evicted)
+            current_app.redis.hincrby(STATS_KEY, 'evicted', len(evicted))
+    except RedisError as e:
+        current_app.logger.warning('Unable to store shot analysis result: ' + str(e))
+
+
+def cache_stats():
+    stats = {kind.decode('utf-8'): int(value) for kind, value in current_app.redis.hgetall(STATS_KEY).items()}
+    stats.setdefault('hit', 0)
+    stats.setdefault('miss', 0)
+    stats.setdefault('evicted', 0)
+    requests = stats['hit'] + stats['miss']
+    stats['hitRatio'] = stats['hit'] / requests if requests else 0.0
+    stats['entries'] = current_app.redis.zcard(ACCESS_KEY)
+    stats['maxEntries'] = current_app.config['SHOT_ANALYSIS_CACHE_SIZE']
+    return stats
+
+
+def _record_access(key, kind):
+    metrics.count_cache('shot-analysis', kind)
+    try:
+        pipeline = current_app.redis.pipeline()
+        pipeline.zadd(ACCESS_KEY, {key: time.time()})
+        pipeline.hincrby(STATS_KEY, kind, 1)
+        pipeline.execute()
+    except RedisError:
+        pass
@@ -0,0 +1,131 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+
+from redis.exceptions import RedisError
+from flask import current_app
+
+from app import device_cache, metrics, single_flight
+from app.execution_windows import current_slot
+from app.providers import fingerprint
+from app.utils import skipped_providers
+
+# results of whole evaluations, stored by the hash of everything they depend on: the credentials, the normalized
+# policies, the programs, the versions of the device catalogs read by the evaluation, and the hour of the week, which
+# determines the execution windows of the devices
+CACHE_PREFIX = 'policy-handler:decision'
+ENTRY_PREFIX = CACHE_PREFIX + ':entry:'
+STATS_KEY = CACHE_PREFIX + ':stats'
+
+
+def evaluation_key(session, credentials, policy_sets, program_source, k):
+    # returns None if the version of a catalog is unknown, e.g., as it was not loaded yet, the catalog of the IBMQ
+    # account is only read if the Qiskit Runtime is allowed by a policy set
+    catalogs = [('aws', session.aws_catalog_scope)]
+    if any(policy_set.qiskit_allowed for policy_set in policy_sets):
+        catalogs.append(('ibm', session.ibm_catalog_scope))
+    versions = [device_cache.catalog_version(provider, scope) for provider, scope in catalogs]
+    if None in versions:
+        return None
+    key = {'provider': current_app.config['PROVIDER'],
+           'credentials': fingerprint(*[value or '' for value in credentials]),
+           'policySets': [policy_set.normalized() for policy_set in policy_sets], 'program': program_source.digest(),
+           'k': k, 'catalogs': versions, 'slot': current_slot()}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def ttl(policy_sets):
+    # the queue sizes of the IBMQ backends change within seconds, all other inputs only if the catalogs change
+    if any(policy_set.queue_depth_dependent for policy_set in policy_sets):
+        return current_app.config['DECISION_CACHE_TTL_QUEUE_DEPTH']
+    return current_app.config['DECISION_CACHE_TTL']
+
+
+def cached_evaluation(evaluation_key, policy_sets, evaluate):
+    # returns the result of a previous identical evaluation or evaluates the policy sets and stores the result,
+    # evaluations missing the devices of a provider, e.g., due to a timeout, are not stored
+    key = evaluation_key()
+    if key is None:
+        # the catalogs are loaded by the evaluation, its result is stored for the versions it was computed with
+        _count('miss')
+        return _evaluate(None, evaluation_key, policy_sets, evaluate)
+    evaluations = lookup(key)
+    if evaluations is not None:
+        return evaluations
+    # identical evaluations arriving at the same time wait for the first one instead of querying the providers again
+    return single_flight.coalesce('evaluation:' + key, lambda: _evaluate(key, evaluation_key, policy_sets, evaluate))
+
+
+def _evaluate(key, evaluation_key, policy_sets, evaluate):
+    # the result may have been stored by an identical evaluation which completed after the lookup
+    evaluations = lookup(key, count=False) if key is not None else None
+    if evaluations is not None:
+        return evaluations
+
+    skipped = []
+    token = skipped_providers.set(skipped)
+    try:
+        evaluations = evaluate()
+    finally:
+        skipped_providers.reset(token)
+    if skipped:
+        current_app.logger.info('Not caching evaluation without devices of ' + ', '.join(skipped))
+        return evaluations
+    # the evaluation may have loaded the catalogs, thus, the result is stored for the versions it was computed with
+    key = evaluation_key()
+    if key is not None:
+        store(key, evaluations, ttl(policy_sets))
+    return evaluations
+
+
+def lookup(key, count=True):
+    try:
+        entry = current_app.redis.get(ENTRY_PREFIX + key)
+    except RedisError as e:
+        current_app.logger.warning('Decision cache unavailable: ' + str(e))
+        return None
+    if count:
+        _count('hit' if entry is not None else 'miss')
+    return json.loads(entry) if entry is not None else None
+
+
+def store(key, evaluations, expiration):
+    try:
+        current_app.redis.set(ENTRY_PREFIX + key, json.dumps(evaluations), ex=int(expiration))
+    except RedisError as e:
+        current_app.logger.warning('Unable to store evaluation in decision cache: ' + str(e))
+
+
+def cache_stats():
+    stats = {kind.decode('utf-8'): int(value) for kind, value in current_app.redis.hgetall(STATS_KEY).items()}
+    stats.setdefault('hit', 0)
+    stats.setdefault('miss', 0)
+    requests = stats['hit'] + stats['miss']
+    stats['hitRatio'] = stats['hit'] / requests if requests else 0.0
+    return stats
+
+
+def _count(kind):
+    metrics.count_cache('decision', kind)
+    try:
+        current_app.redis.hincrby(STATS_KEY, kind, 1)
+    except RedisError:
+        pass
@@ -16,231 +16,159 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 # ******************************************************************************
-import os
-import urllib
+import multiprocessing
 import zipfile
-from tempfile import mkdtemp
-from flask import abort
-from redbaron import RedBaron
-
-from app import app
-from app.policy_evaluation.zip_handler import search_python_file
-from qiskit import IBMQ
-
-def count_and_extract_shots(filename):
-    # Load the file with RedBaron
-    with open(filename, 'r') as f:
-        red = RedBaron(f.read())
-
-    # run, run_batch, create_quantum_task in aws programs
-    # run and create_quantum_task create exactly one task that's why we count both of them in one variable
-    count_quantum_tasks_statements = 0
-    count_quantum_tasks_shots = 0
-    count_batch_statements = 0
-    count_batch_shots = 0
-
-    # execute statements are in qiskit programs
-    count_execute_statements = 0
-    count_execute_shots = 0
-
-    for function in red.find_all("def"):
-        for node in function.find_all("atomtrailers"):
-            if node[0].value == "device" and node[1].value == "run":
-                count_quantum_tasks_statements += 1
-                # source_code = "x = 1"
-                # red2 = RedBaron(source_code)
-                # node.append(source_code)
-                # new_node_list = RedBaron("print('x is 1')")
-                # node.parent.insert_after(new_node_list)
-                # find the node representing the second argument
-                second_arg = red.find('name', value="shots").parent.value
-                try:
-                    # get the value of the second argument
-                    print(second_arg)
-                    count_quantum_tasks_shots += int(node[2].value[1].value.value)
-                except TypeError:
-                    app.logger.info("Runtime evaluation is required")
-                    abort(400)
-            if node[0].value == "qiskit" and node[1].value == "execute":
-                count_execute_statements += 1
-                # get the value of the second argument
-                print(int(node[2].value[2].value.value))
-                try:
-                    count_execute_shots += int(node[2].value[2].value.value)
-                except TypeError:
-                    app.logger.info("Runtime evaluation is required")
-                    abort(400)
-
-                print(count_execute_shots)
-                app.logger.info("THE SHOTS IN EXECUTE")
-                app.logger.info(count_execute_shots)
-            if node[0].value == "device" and node[1].value == "run_batch":
-                count_batch_statements += 1
-                shots = node[2].value[1].value
-                try:
-                    count_batch_shots += shots
-                except TypeError:
-                    app.logger.info("Runtime evaluation is required")
-                    abort(400)
-            if node[0].value == "braket_client" and node[1].value == "create_quantum_task":
-                count_quantum_tasks_statements += 1
-                shots = node[2].value.find("name", value="shots").parent.value
-                try:
-                    count_quantum_tasks_shots += shots
-                except TypeError:
-                    app.logger.info("Runtime evaluation is required")
-                    abort(400)
-
-    app.logger.info("number of quantum tasks")
-    app.logger.info(count_quantum_tasks_statements)
-
-    app.logger.info("number of quantum task shots")
-    app.logger.info(count_quantum_tasks_shots)
-
-    app.logger.info("number of batch tasks")
-    app.logger.info(count_batch_statements)
-
-    app.logger.info("number of batch task shots")
-    app.logger.info(count_batch_shots)
-
-    app.logger.info("number of execute statements")
-    app.logger.info(count_execute_statements)
-
-    app.logger.info("number of execute shots")
-    app.logger.info(count_execute_shots)
-
-    return count_quantum_tasks_statements, count_quantum_tasks_shots, count_batch_statements, count_batch_shots, \
-           count_execute_statements, count_execute_shots
-
-
-def calculate_costs(devices, money_policy, required_programs_url):
-    app.logger.info("Start to estimate costs")
-    # get URL to the ZIP file with the required programs
-    url = 'http://' + os.environ.get('FLASK_RUN_HOST') + ':' + os.environ.get('FLASK_RUN_PORT') + required_programs_url
-
-    # download the ZIP file
-    app.logger.info('Downloading required programs from: ' + str(url))
-    download_path, response = urllib.request.urlretrieve(url, "requiredPrograms.zip")
-
-    # dict to store task IDs and the paths to the related programs
-    task_id_program_map = {}
-
-    # extract the zip file
-    with zipfile.ZipFile(download_path, "r") as zip_ref:
-        directory = mkdtemp()
-        app.logger.info('Extracting to directory: ' + str(directory))
-        zip_ref.extractall(directory)
-
-        # zip contains one folder per task within the candidate
-        zip_contents = [f for f in os.listdir(directory)]
-        for zipContent in zip_contents:
-            app.logger.info('Searching for program related to task with ID: ' + str(zipContent))
-
-            # search for Python file and store with ID if found
-            python_file = search_python_file(os.path.join(directory, zipContent))
-            if python_file is not None:
-                task_id_program_map[zipContent] = python_file
-
-    sum_count_quantum_tasks_statements = 0
-    sum_count_quantum_tasks_shots = 0
-    sum_count_batch_statements = 0
-    sum_count_batch_shots = 0
-    sum_count_execute_statements = 0
-    sum_count_execute_shots = 0
-    for task in task_id_program_map:
-        count_quantum_tasks_statements, count_quantum_tasks_shots, count_batch_statements, count_batch_shots, \
-        count_execute_statements, count_execute_shots = count_and_extract_shots(task_id_program_map[task])
-        sum_count_quantum_tasks_statements += count_quantum_tasks_statements
-        sum_count_quantum_tasks_shots += count_quantum_tasks_shots
-        sum_count_batch_statements += count_batch_statements
-        sum_count_batch_shots += count_batch_shots
-        sum_count_execute_statements += count_execute_statements
-        sum_count_execute_shots += count_execute_shots
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import abort, current_app
 
-    price_per_qpu = compute_price_per_qpu(sum_count_quantum_tasks_statements, sum_count_quantum_tasks_shots,
-                                          sum_count_batch_statements, sum_count_batch_shots,
-                                          sum_count_execute_statements, sum_count_execute_shots, devices)
-    app.logger.info("The result of qpu costs")
-    app.logger.info(price_per_qpu)
-    return price_per_qpu
+from app import device_cache, metrics
+from app.policy_evaluation import analysis_cache, pricing
+from app.policy_evaluation.zip_handler import find_task_programs
 
+# process pool for the shot analysis, created on first use so that each gunicorn worker gets its own pool
+_analysis_executor = None
 
-def compute_price_per_qpu(count_quantum_tasks_statements, count_quantum_tasks_shots, count_batch_statements,
-                          count_batch_shots, count_execute_statements, count_execute_shots, devices):
-    result = []
-    for device in devices:
-        price_of_tasks_with_shots = 0
 
-        # currently it is not possible to retrieve the task price of each QPU, but it is actually the same for all
-        # devices 0.3 USD
-        price_of_tasks = count_quantum_tasks_statements * 0.3
-        if device.name == "Lucy":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * count_quantum_tasks_statements * \
-                                        count_quantum_tasks_shots
+def calculate_costs(devices, money_policy, required_programs):
+    current_app.logger.info("Start to estimate costs")
+    # the ZIP file with the required programs is read from the upload folder
+    current_app.logger.info('Reading required programs from: ' + str(required_programs))
 
-        if device.name == "IonQ":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * count_quantum_tasks_statements * \
-                                        count_quantum_tasks_shots
+    # dict to store task IDs and the names and contents of the related programs, the programs are read from the
+    # zip file without extracting it
+    try:
+        with required_programs.open() as archive:
+            task_id_program_map = find_task_programs(archive)
+    except (ValueError, zipfile.BadZipFile) as e:
+        current_app.logger.info('Unable to inspect required programs: ' + str(e))
+        abort(400)
 
-        if device.name == "Aspen-M-2":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * count_quantum_tasks_statements * \
-                                        count_quantum_tasks_shots
+    sum_count_quantum_tasks_statements, sum_count_quantum_tasks_shots, sum_count_batch_statements, \
+    sum_count_batch_shots, sum_count_execute_statements, sum_count_execute_shots = analyze_programs(task_id_program_map)
 
-        if device.name == "Aspen-M-3":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * count_quantum_tasks_statements * \
-                                        count_quantum_tasks_shots
-        result.append(price_of_tasks_with_shots + price_of_tasks)
+    price_per_qpu = compute_price_per_qpu(sum_count_quantum_tasks_statements, sum_count_quantum_tasks_shots,
+                                          sum_count_batch_statements, sum_count_batch_shots,
+                                          sum_count_execute_statements, sum_count_execute_shots, devices)
+    current_app.logger.info("The result of qpu costs")
+    current_app.logger.info(price_per_qpu)
+    return price_per_qpu
 
-    return result
 
+@metrics.timed('shot-analysis')
+def analyze_programs(task_id_program_map):
+    # task_id_program_map maps each task ID to the name and the content of the related program
+    # returns the sums of the six counters over all programs, programs which are not in the analysis cache are
+    # analyzed in parallel by the process pool
+    sources = {task: task_id_program_map[task][1] for task in task_id_program_map}
+    filenames = {task: task_id_program_map[task][0] for task in task_id_program_map}
+
+    # identical programs of different tasks are only analyzed once
+    digests = {task: analysis_cache.program_hash(sources[task]) for task in sources}
+    entries = {}
+    pending = {}
+    for task in sorted(sources):
+        digest = digests[task]
+        if digest in entries or digest in pending:
+            continue
+        entry = analysis_cache.lookup(digest)
+        if entry is not None:
+            entries[digest] = entry
+        else:
+            pending[digest] = task
+
+    def analyze_inline(digest, task):
+        entries[digest] = analysis_cache.analyze_entry(sources[task], filenames[task])
+        analysis_cache.store(digest, entries[digest])
+
+    if len(pending) == 1:
+        # not worth the overhead of passing the program to another process
+        analyze_inline(*pending.popitem())
+
+    if pending:
+        current_app.logger.info('Analyzing ' + str(len(pending)) + ' programs in parallel')
+        executor = get_analysis_executor()
+        try:
+            futures = {executor.submit(analysis_cache.analyze_entry, sources[task], filenames[task]): digest
+                       for digest, task in pending.items()}
+            # one deadline for all programs of the workflow instead of one timeout per program
+            done, timed_out = wait(futures, timeout=current_app.config['SHOT_ANALYSIS_TIMEOUT'])
+            for future in done:
+                entries[futures[future]] = future.result()
+                analysis_cache.store(futures[future], entries[futures[future]])
+        except BrokenProcessPool as e:
+            # a process of the pool died, e.g., killed because of its memory usage, the pool is replaced on its next
+            # use and the remaining programs are analyzed in this process
+            current_app.logger.warning('Shot analysis pool is broken, analyzing the programs inline: ' + str(e))
+            reset_analysis_executor(executor)
+            for digest, task in pending.items():
+                if digest not in entries:
+                    analyze_inline(digest, task)
+            timed_out = ()
+        if timed_out:
+            # the programs which did not start yet are cancelled and the pool is replaced, thus, the next requests do
+            # not wait behind the programs which are still analyzed
+            for future in timed_out:
+                future.cancel()
+            reset_analysis_executor(executor)
+            tasks = sorted(pending[futures[future]] for future in timed_out)
+            current_app.logger.info('Analysis of the programs of tasks ' + ', '.join(tasks) + ' timed out, runtime '
+                                    'evaluation is required')
+            abort(400)
+
+    # aggregate in the order of the task IDs to get the same result independent of the completion order
+    sums = [0] * 6
+    for task in sorted(sources):
+        try:
+            counts = analysis_cache.counts_from_entry(entries[digests[task]]).as_tuple()
+        except ValueError as e:
+            current_app.logger.info("Runtime evaluation is required for task " + task + ": " + str(e))
+            abort(400)
+        sums = [total + count for total, count in zip(sums, counts)]
+    current_app.logger.info("Counters of all programs")
+    current_app.logger.info(sums)
+    return tuple(sums)
+
+
+def get_analysis_executor():
+    # the processes are not forked from the gunicorn worker, which already runs threads, e.g., for the provider
+    # lookups, but started from a clean server process
+    global _analysis_executor
+    if _analysis_executor is None:
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _analysis_executor = ProcessPoolExecutor(max_workers=current_app.config['SHOT_ANALYSIS_PROCESSES'],
+                                                 mp_context=multiprocessing.get_context(start_method))
+    return _analysis_executor
+
+
+def reset_analysis_executor(executor):
+    global _analysis_executor
+    if _analysis_executor is executor:
+        _analysis_executor = None
+    executor.shutdown(wait=False)
 
-def calculate_costs_qiskit(sumExecutionTimeClassical, sumExecutionTimeQuantum, devices):
-    provider = IBMQ.load_account()
-    backends = provider.backends()
-    results = []
-    for device in backends:
-        results.append(0);
 
-    for device in devices:
-        if device not in backends:
-            results(1.6 * (float(sumExecutionTimeClassical) + float(sumExecutionTimeQuantum)))
+def compute_price_per_qpu(count_quantum_tasks_statements, count_quantum_tasks_shots, count_batch_statements,
+                          count_batch_shots, count_execute_statements, count_execute_shots, devices):
+    # costs of the quantum tasks on each device, one value per device in the order of devices
+    usage = pricing.usage_vector(tasks=count_quantum_tasks_statements, shots=count_quantum_tasks_shots)
+    return pricing.estimate_costs(devices, usage).tolist()
+
 
-    return results
+@metrics.timed('costs')
+def calculate_costs_qiskit(sumExecutionTimeClassical, sumExecutionTimeQuantum, devices, session):
+    # one value per device, the backends of the account are free, all others are charged by the execution time
+    backend_names = set(backend.name for backend in device_cache.get_ibm_backends(session.ibm_catalog_scope,
+                                                                                 session.ibm_backends))
+    price = 1.6 * (float(sumExecutionTimeClassical) + float(sumExecutionTimeQuantum))
+    return [0 if device in backend_names else price for device in devices]
 
 
 def calculate_costs_aws(sumExecutionTimeClassical, sumExecutionTimeQuantum,sumNumberOfQuantumShots,
                         sumNumberOfQuantumTasks, aws_devices):
-    result = []
-    classical_ressources = sumExecutionTimeClassical * 0.00443
-    for device in aws_devices:
-        price_of_tasks_with_shots = 0
-        if device.name == "SV1":
-            simulator_cost = device.properties.service.deviceCost.price * sumExecutionTimeQuantum
-            result.append(simulator_cost + classical_ressources)
-        if device.name == "TN1":
-            simulator_cost = device.properties.service.deviceCost.price * sumExecutionTimeQuantum
-            result.append(simulator_cost + classical_ressources)
-        if device.name == "dm1":
-            simulator_cost = device.properties.service.deviceCost.price * sumExecutionTimeQuantum
-            result.append(simulator_cost + classical_ressources)
-        # currently it is not possible to retrieve the task price of each QPU, but it is actually the same for all
-        # devices 0.3 USD
-        price_of_tasks = sumNumberOfQuantumTasks * 0.3
-        if device.name == "Lucy":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * sumNumberOfQuantumTasks * \
-                                        sumNumberOfQuantumShots
-            result.append(price_of_tasks_with_shots + price_of_tasks + classical_ressources)
-        if device.name == "IonQ":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * sumNumberOfQuantumTasks * \
-                                        sumNumberOfQuantumShots
-            result.append(price_of_tasks_with_shots + price_of_tasks + classical_ressources)
-        if device.name == "Aspen-M-2":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * sumNumberOfQuantumTasks * \
-                                        sumNumberOfQuantumShots
-            result.append(price_of_tasks_with_shots + price_of_tasks + classical_ressources)
-        if device.name == "Aspen-M-3":
-            price_of_tasks_with_shots = device.properties.service.deviceCost.price * sumNumberOfQuantumTasks * \
-                                        sumNumberOfQuantumShots
-            result.append(price_of_tasks_with_shots + price_of_tasks + classical_ressources)
-
-    return result
\ No newline at end of file
+    # QPUs are charged per task and shot, simulators by the quantum execution time, and the classical resources of
+    # the hybrid job by the classical execution time
+    usage = pricing.usage_vector(tasks=float(sumNumberOfQuantumTasks), shots=float(sumNumberOfQuantumShots),
+                                 quantum_minutes=float(sumExecutionTimeQuantum),
+                                 classical_time=float(sumExecutionTimeClassical))
+    return pricing.estimate_costs(aws_devices, usage).tolist()
\ No newline at end of file
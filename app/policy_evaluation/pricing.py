@@ -0,0 +1,125 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import numpy as np
+from flask import current_app
+
+from app import metrics
+
+# currently it is not possible to retrieve the task price of each QPU, but it is actually the same for all devices
+TASK_PRICE = 0.3
+
+# price of the classical resources of a hybrid job per unit of classical execution time
+CLASSICAL_RATE = 0.00443
+
+# price of devices whose costs are unknown, their costs are not finite and they are left out of the cost ranking
+UNPRICED = float('inf')
+
+# pricing models of all AWS devices by ARN, taken from the device descriptors of the catalog
+_registry = {}
+
+# price matrices of recently evaluated device lists, cleared whenever a price changes
+_matrices = {}
+MAX_CACHED_MATRICES = 16
+
+
+class PricingModel(object):
+    # prices of one device, the costs of a workload are the dot product with its usage (see usage_vector)
+    __slots__ = ('per_task', 'per_shot', 'per_minute', 'classical_rate')
+
+    def __init__(self, per_task=0.0, per_shot=0.0, per_minute=0.0, classical_rate=CLASSICAL_RATE):
+        self.per_task = per_task
+        self.per_shot = per_shot
+        self.per_minute = per_minute
+        self.classical_rate = classical_rate
+
+    @classmethod
+    def from_properties(cls, properties):
+        device_cost = getattr(properties.service, 'deviceCost', None)
+        if device_cost is None:
+            return cls.unpriced()
+        unit = device_cost.unit.lower()
+        if unit == 'shot':
+            # QPUs are charged per task and per shot
+            return cls(per_task=TASK_PRICE, per_shot=device_cost.price)
+        if unit == 'task':
+            return cls(per_task=TASK_PRICE + device_cost.price)
+        if unit == 'minute':
+            # simulators are charged by the execution time
+            return cls(per_minute=device_cost.price)
+        if unit == 'hour':
+            return cls(per_minute=device_cost.price / 60)
+        current_app.logger.warning('Unknown unit of device costs: ' + device_cost.unit)
+        return cls.unpriced()
+
+    @classmethod
+    def unpriced(cls):
+        return cls(per_task=UNPRICED, per_shot=UNPRICED, per_minute=UNPRICED)
+
+    def as_list(self):
+        return [self.per_task, self.per_shot, self.per_minute, self.classical_rate]
+
+    def __eq__(self, other):
+        return isinstance(other, PricingModel) and self.as_list() == other.as_list()
+
+    def __repr__(self):
+        return 'PricingModel({}, {}, {}, {})'.format(*self.as_list())
+
+
+def register(arn, prices):
+    # prices is the list stored with the device catalog, the model is only replaced if the prices changed
+    model = _registry.get(arn)
+    if model is None or model.as_list() != prices:
+        model = _registry[arn] = PricingModel(*prices)
+        _matrices.clear()
+    return model
+
+
+def pricing_model(device):
+    # device descriptors (see app.device_descriptor) are registered when they are loaded from the device cache
+    model = _registry.get(device.arn)
+    if model is None:
+        model = register(device.arn, device.pricing.as_list())
+    return model
+
+
+def price_matrix(devices):
+    # devices x (task, shot, minute, classical) matrix with the prices of each device, the matrix is reused as long
+    # as the same devices are evaluated and their prices do not change
+    key = tuple(device.arn for device in devices)
+    matrix = _matrices.get(key)
+    if matrix is None:
+        matrix = np.zeros((len(devices), 4))
+        for row, device in enumerate(devices):
+            matrix[row] = pricing_model(device).as_list()
+        if len(_matrices) >= MAX_CACHED_MATRICES:
+            _matrices.pop(next(iter(_matrices)))
+        _matrices[key] = matrix
+    return matrix
+
+
+def usage_vector(tasks=0, shots=0, quantum_minutes=0, classical_time=0):
+    # shots is the number of shots per task
+    return np.array([tasks, tasks * shots, quantum_minutes, classical_time], dtype=float)
+
+
+@metrics.timed('costs')
+def estimate_costs(devices, usage):
+    # costs of the workload on every device with a single matrix-vector product, one value per device
+    return price_matrix(devices).dot(usage)
@@ -16,28 +16,24 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 # ******************************************************************************
-from app import app
+from flask import current_app
 
 
 def evaluate_privacy_aws(devices, privacy_policy):
-    app.logger.info("Start to evaluate privacy")
-    data_retention = privacy_policy['privacyPolicy']['dataRetention']
-    third_party_qpu = privacy_policy['privacyPolicy']['thirdPartyQPU']
+    current_app.logger.info("Start to evaluate privacy")
+    data_retention, third_party_qpu = privacy_factors_aws(privacy_policy)
+    return [data_retention] * len(devices), [third_party_qpu] * len(devices)
 
-    data_retention_result = [0] * len(devices)
-    third_party_qpu_result = [0] * len(devices)
 
-    for i in range(len(devices)):
-        if data_retention == 'true':
-            data_retention_result[i] = 1
-        if third_party_qpu == 'true':
-            third_party_qpu_result[i] = 1
-
-    return data_retention_result, third_party_qpu_result
+def privacy_factors_aws(privacy_policy):
+    # the privacy criteria are the same for all AWS devices, thus, they are evaluated once per policy
+    data_retention = privacy_policy['privacyPolicy']['dataRetention']
+    third_party_qpu = privacy_policy['privacyPolicy']['thirdPartyQPU']
+    return int(data_retention == 'true'), int(third_party_qpu == 'true')
 
 
 def evaluate_privacy_qiskit(devices, privacy_policy):
-    app.logger.info("Start to evaluate privacy")
+    current_app.logger.info("Start to evaluate privacy")
     data_retention = privacy_policy['privacyPolicy']['dataRetention']
     third_party_qpu = privacy_policy['privacyPolicy']['thirdPartyQPU']
 
@@ -0,0 +1,49 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import os
+
+from app import upload_store
+
+# archives with the required programs are provided to the evaluation as program sources, open() returns a
+# binary file object which can directly be passed to zipfile.ZipFile, digest() the SHA-256 hash of the archive
+
+
+class StoredProgramSource(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def digest(self):
+        # uploads are stored by the hash of their content, other files are hashed
+        digest = upload_store.parse_digest(os.path.basename(self.path))
+        if digest is None:
+            digest = hashlib.sha256()
+            with self.open() as archive:
+                for chunk in iter(lambda: archive.read(upload_store.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+        return digest
+
+    def __repr__(self):
+        return 'StoredProgramSource({})'.format(self.path)
@@ -0,0 +1,101 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from redis.exceptions import RedisError
+from flask import current_app
+
+from app import metrics
+from app.utils import skip_provider
+
+QUEUE_DEPTH_PREFIX = 'policy-handler:queue-depth:'
+
+# threads polling the backends, created on first use as the number of threads is configured by the application
+_status_executor = None
+
+
+@metrics.timed('queue-depth')
+def collect_pending_jobs(backend_names, session):
+    # returns the number of pending jobs for each backend, values which were polled within the last
+    # QUEUE_DEPTH_TTL seconds are taken from Redis, all others are polled concurrently. Backends whose status cannot
+    # be retrieved are missing in the result.
+    pending_jobs = {}
+    keys = [QUEUE_DEPTH_PREFIX + name for name in backend_names]
+    try:
+        cached = current_app.redis.mget(keys) if keys else []
+    except RedisError as e:
+        current_app.logger.warning('Queue depth cache unavailable: ' + str(e))
+        cached = [None] * len(keys)
+    for name, value in zip(backend_names, cached):
+        if value is not None:
+            pending_jobs[name] = int(value)
+
+    missing = [name for name in backend_names if name not in pending_jobs]
+    metrics.count_cache('queue-depth', 'hit', len(pending_jobs))
+    metrics.count_cache('queue-depth', 'miss', len(missing))
+    if not missing:
+        return pending_jobs
+
+    current_app.logger.info('Polling queue depth of ' + str(len(missing)) + ' IBMQ backends')
+    polled = poll_pending_jobs(missing, session)
+    store_pending_jobs(polled, current_app.config['QUEUE_DEPTH_TTL'])
+    pending_jobs.update(polled)
+
+    # backends whose status cannot be retrieved are missing in the result instead of being ranked like a backend without
+    # pending jobs, thus, the evaluation is not cached either
+    if len(polled) < len(missing):
+        skip_provider('IBMQ')
+    return pending_jobs
+
+
+def poll_pending_jobs(backend_names, session):
+    # polls all backends concurrently, backends whose status cannot be retrieved are skipped
+    def poll(name):
+        try:
+            return session.pending_jobs(name)
+        except Exception as e:
+            metrics.count_provider_error('IBMQ', 'queue-depth')
+            current_app.logger.warning('Unable to poll queue depth of ' + name + ': ' + str(e))
+            return None
+
+    # the polls run in a copy of the context to use the application of the request or the refresher job
+    executor = _get_status_executor()
+    polls = [executor.submit(contextvars.copy_context().run, poll, name) for name in backend_names]
+    polled = zip(backend_names, [future.result() for future in polls])
+    return {name: value for name, value in polled if value is not None}
+
+
+def _get_status_executor():
+    global _status_executor
+    if _status_executor is None:
+        _status_executor = ThreadPoolExecutor(max_workers=current_app.config['DISCOVERY_MAX_WORKERS'],
+                                              thread_name_prefix='queue-depth')
+    return _status_executor
+
+
+def store_pending_jobs(pending_jobs, ttl):
+    try:
+        pipeline = current_app.redis.pipeline()
+        for name, value in pending_jobs.items():
+            pipeline.set(QUEUE_DEPTH_PREFIX + name, value, ex=int(ttl))
+        pipeline.execute()
+    except RedisError as e:
+        current_app.logger.warning('Unable to store queue depths: ' + str(e))
@@ -0,0 +1,72 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import heapq
+import math
+
+from app import metrics
+
+# value of the k parameter to retrieve the complete ranking
+ALL_DEVICES = 'all'
+
+
+def parse_k(value):
+    # None if no ranking is requested, otherwise a positive number of devices or ALL_DEVICES
+    if value is None or str(value) == ALL_DEVICES:
+        return value
+    k = int(value)
+    if k < 1:
+        raise ValueError('k must be a positive number or \'' + ALL_DEVICES + '\'')
+    return k
+
+
+def device_name(device):
+    # devices are either names, AWS devices, or IBMQ backends providing their name via a method
+    name = getattr(device, 'name', device)
+    return name() if callable(name) else name
+
+
+@metrics.timed('ranking')
+def rank_devices(devices, criteria, scores, k=1):
+    # returns the k best devices with their score and the value of each criterion, criteria maps the name of each
+    # criterion to its values per device. The best device has the highest score if any score is negative and the
+    # lowest score otherwise. Partial selection with a heap takes O(n log k) instead of sorting all devices. Devices
+    # with a NaN score, i.e., an unknown value of a weighted criterion, are left out.
+    count = min([len(devices), len(scores)] + [len(values) for values in criteria.values()])
+    candidates = [index for index in range(count) if not math.isnan(scores[index])]
+    if not candidates:
+        return []
+    descending = min(scores[index] for index in candidates) < 0
+    select = heapq.nlargest if descending else heapq.nsmallest
+    k = len(candidates) if k is None or k == ALL_DEVICES else k
+    best = select(k, candidates, key=lambda index: scores[index])
+    return [{'rank': rank + 1, 'device': device_name(devices[index]), 'score': float(scores[index]),
+             'criteria': {name: criterion_value(values[index]) for name, values in criteria.items()}}
+            for rank, index in enumerate(best)]
+
+
+def criterion_value(value):
+    # unknown values of criteria which are not weighted are reported as None, NaN and infinity are not valid JSON
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def to_list(entry):
+    # format of the previous responses: device, values of all criteria, and score
+    return [entry['device']] + list(entry['criteria'].values()) + [entry['score']]
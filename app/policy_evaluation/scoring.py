@@ -0,0 +1,53 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import numpy as np
+
+from app import metrics
+
+
+def build_criteria_matrix(criteria):
+    # criteria contains one list per criterion with one value per device, the result is a devices x criteria
+    # matrix, like zip() the number of devices is limited by the shortest list
+    if not criteria:
+        return np.zeros((0, 0))
+    device_count = min(len(values) for values in criteria)
+    matrix = np.empty((device_count, len(criteria)))
+    for column, values in enumerate(criteria):
+        matrix[:, column] = np.asarray(values[:device_count], dtype=float)
+    return matrix
+
+
+@metrics.timed('scoring')
+def score_matrix(matrix, weights):
+    # weights contains one weight per criterion, or one column of weights per policy set to score several policy
+    # sets at once, fractional costs and hours are kept instead of being truncated to integers. Devices with an
+    # unknown value, i.e., NaN or infinite like the costs of unpriced devices, in a weighted criterion get a NaN score
+    # and are left out of the ranking.
+    weights = np.asarray(weights, dtype=float)
+    known = np.isfinite(matrix)
+    if known.all():
+        return matrix.dot(weights)
+    scores = np.where(known, matrix, 0).dot(weights)
+    scores[(~known).dot(weights != 0)] = np.nan
+    return scores
+
+
+def score_devices(criteria, weights):
+    return score_matrix(build_criteria_matrix(criteria), weights)
@@ -0,0 +1,102 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import ast
+
+# has to be increased whenever the counters returned for a program change
+ANALYZER_VERSION = 1
+
+# statements creating quantum tasks: (receiver, method) -> (counter, position of the shots argument)
+# run and create_quantum_task create exactly one task that's why they are counted in the same counter
+TASK_STATEMENTS = {
+    ('device', 'run'): ('quantum_tasks', 1),
+    ('device', 'run_batch'): ('batch', 1),
+    ('braket_client', 'create_quantum_task'): ('quantum_tasks', None),
+    ('qiskit', 'execute'): ('execute', 2)
+}
+
+
+class ShotCounts(object):
+    __slots__ = ('quantum_tasks_statements', 'quantum_tasks_shots', 'batch_statements', 'batch_shots',
+                 'execute_statements', 'execute_shots')
+
+    def __init__(self):
+        for counter in self.__slots__:
+            setattr(self, counter, 0)
+
+    def as_tuple(self):
+        return tuple(getattr(self, counter) for counter in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls, values):
+        counts = cls()
+        for counter, value in zip(cls.__slots__, values):
+            setattr(counts, counter, value)
+        return counts
+
+
+class _ShotVisitor(ast.NodeVisitor):
+
+    def __init__(self):
+        self.counts = ShotCounts()
+        self._function_depth = 0
+
+    def visit_FunctionDef(self, node):
+        # like the previous RedBaron based analysis, only statements within functions are taken into account
+        self._function_depth += 1
+        self.generic_visit(node)
+        self._function_depth -= 1
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        if self._function_depth and isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            statement = TASK_STATEMENTS.get((node.func.value.id, node.func.attr))
+            if statement is not None:
+                counter, position = statement
+                shots = _extract_shots(node, position)
+                setattr(self.counts, counter + '_statements', getattr(self.counts, counter + '_statements') + 1)
+                setattr(self.counts, counter + '_shots', getattr(self.counts, counter + '_shots') + shots)
+        self.generic_visit(node)
+
+
+def analyze_shots(source, filename='<program>'):
+    # returns the number of task creating statements and their shots, raises a ValueError if the shots of a
+    # statement are not an integer literal and can therefore only be determined at runtime or if the program cannot
+    # be parsed, e.g., because of a syntax error, syntax not supported by the Python version of the policy handler,
+    # or expressions nested too deeply for the parser or the recursive visitor
+    visitor = _ShotVisitor()
+    try:
+        visitor.visit(ast.parse(source, filename))
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        raise ValueError('Unable to parse program: ' + (str(e) or type(e).__name__))
+    return visitor.counts
+
+
+def _extract_shots(call, position):
+    shots = next((keyword.value for keyword in call.keywords if keyword.arg == 'shots'), None)
+    if shots is None and position is not None and len(call.args) > position:
+        shots = call.args[position]
+    try:
+        value = ast.literal_eval(shots) if shots is not None else None
+    except (ValueError, TypeError):
+        value = None
+    if type(value) is not int:
+        raise ValueError('Number of shots in line ' + str(call.lineno) + ' can only be determined at runtime')
+    return value
@@ -17,43 +17,117 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from os import listdir
-from tempfile import mkdtemp
+from collections import defaultdict
 
-from app import app
+from flask import current_app
+
+from app import metrics
+import io
 import zipfile
 import os
 
 
-def search_python_file(directory):
+class ZipLimits(object):
+    # bounds the number of members and the uncompressed bytes read from an uploaded archive, shared by all
+    # nested archives so that the memory used for the inspection stays bounded
+
+    def __init__(self, max_members, max_uncompressed_size, max_depth):
+        self.remaining_members = max_members
+        self.remaining_size = max_uncompressed_size
+        self.max_depth = max_depth
+
+    def check_members(self, zip_ref):
+        self.remaining_members -= len(zip_ref.infolist())
+        if self.remaining_members < 0:
+            raise ValueError('Uploaded archive contains too many files')
+
+    def read(self, zip_ref, info):
+        # the declared size is checked first, but the actual size is enforced while reading
+        if info.file_size > self.remaining_size:
+            raise ValueError('Uncompressed size of uploaded archive is too large: ' + info.filename)
+        with zip_ref.open(info) as member:
+            content = member.read(self.remaining_size + 1)
+        if len(content) > self.remaining_size:
+            raise ValueError('Uncompressed size of uploaded archive is too large: ' + info.filename)
+        self.remaining_size -= len(content)
+        return content
+
+
+def default_zip_limits():
+    return ZipLimits(current_app.config['ZIP_MAX_MEMBERS'], current_app.config['ZIP_MAX_UNCOMPRESSED_SIZE'],
+                     current_app.config['ZIP_MAX_DEPTH'])
+
+
+@metrics.timed('zip')
+def find_task_programs(archive, limits=None):
+    # zip contains one folder per task, returns the task IDs with the name and the content of the related program
+    # without extracting anything to disk
+    if limits is None:
+        limits = default_zip_limits()
+    task_id_program_map = {}
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+        limits.check_members(zip_ref)
+        members = _index_members(zip_ref)
+        tasks = sorted(folder[:-1] for folder in members if folder.count('/') == 1)
+        for task in tasks:
+            current_app.logger.info('Searching for program related to task with ID: ' + str(task))
+
+            # search for Python file and store with ID if found
+            python_file = search_python_file(zip_ref, members, task + '/', limits)
+            if python_file is not None:
+                task_id_program_map[task] = python_file
+    return task_id_program_map
+
+
+def search_python_file(zip_ref, members, folder, limits, depth=0):
     # only .py are supported, also nested in zip files
-    contained_python_files = [f for f in listdir(os.path.join(directory)) if f.endswith('.py')]
+    contained_python_files = [info for info in members[folder] if info.filename.endswith('.py')]
     if len(contained_python_files) >= 1:
-        app.logger.info('Found Python file with name: ' + str(contained_python_files[0]))
+        current_app.logger.info('Found Python file with name: ' + str(contained_python_files[0].filename))
 
         # we only support one file, in case there are multiple files, try the first one
-        return os.path.join(directory, contained_python_files[0])
+        return contained_python_files[0].filename, limits.read(zip_ref, contained_python_files[0])
 
     # check if there are nested Python files
-    contained_zip_files = [f for f in listdir(os.path.join(directory)) if f.endswith('.zip')]
-    for zip in contained_zip_files:
+    contained_zip_files = [info for info in members[folder] if info.filename.endswith('.zip')]
+    for info in contained_zip_files:
+        if depth >= limits.max_depth:
+            raise ValueError('Uploaded archive contains too deeply nested archives: ' + info.filename)
 
-        # extract the zip file
-        with zipfile.ZipFile(os.path.join(directory, zip), "r") as zip_ref:
-            folder = mkdtemp()
-            app.logger.info('Extracting to directory: ' + str(folder))
-            zip_ref.extractall(folder)
+        # open the nested zip file from memory
+        with zipfile.ZipFile(io.BytesIO(limits.read(zip_ref, info)), "r") as nested_zip_ref:
+            limits.check_members(nested_zip_ref)
 
             # recursively search within zip
-            result = search_python_file(folder)
+            result = search_python_file(nested_zip_ref, _index_members(nested_zip_ref), '', limits, depth + 1)
 
             # return if we found the first Python file
             if result is not None:
-                return os.path.join(folder, result)
+                return result
 
     return None
 
 
+def _index_members(zip_ref):
+    # maps each folder ('' for the root, otherwise with trailing slash) to the files directly contained in it,
+    # sorted by name to select the same program independent of the order within the archive
+    members = defaultdict(list)
+    for info in sorted(zip_ref.infolist(), key=lambda member: member.filename):
+        path = info.filename.rstrip('/')
+        parent = path[:path.rfind('/') + 1]
+        if info.is_dir():
+            members.setdefault(path + '/', [])
+        else:
+            members[parent].append(info)
+
+    # folders are not necessarily contained as separate entries
+    for folder in list(members):
+        while folder:
+            folder = folder[:folder[:-1].rfind('/') + 1]
+            members.setdefault(folder, [])
+    return members
+
+
 def zip_runtime_program(hybrid_program_temp, meta_data_temp):
     if os.path.exists('../hybrid_program.zip'):
         os.remove('../hybrid_program.zip')
@@ -0,0 +1,105 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+
+from flask import make_response, request, url_for, current_app
+
+from app import metrics
+
+# header or query parameter to request the profiling of an evaluation
+PROFILE_HEADER = 'X-Policy-Handler-Profile'
+PROFILE_PARAMETER = 'profile'
+
+
+def profiling_requested():
+    # profiling is only possible if it is enabled, if a token is configured, the header or parameter must contain it
+    if not current_app.config['PROFILING_ENABLED']:
+        return False
+    value = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAMETER)
+    if not value:
+        return False
+    token = current_app.config['PROFILING_TOKEN']
+    return value == token if token else value.lower() in ('true', '1')
+
+
+def profiled(view):
+    # decorator for views which profiles the request on demand, the response then contains the URLs of the stored
+    # cProfile statistics and the trace of the evaluation stages in the headers
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested():
+            return view(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        token = metrics.start_trace()
+        started = time.time()
+        profile.enable()
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            profile.disable()
+            trace = metrics.stop_trace(token)
+            name = store_profile(profile, trace, started)
+        response.headers[PROFILE_HEADER] = url_for('api.download_profile', name=name + '.prof')
+        response.headers[PROFILE_HEADER + '-Trace'] = url_for('api.download_profile', name=name + '.json')
+        return response
+    return wrapper
+
+
+def profile_folder():
+    return os.path.join(current_app.config['RESULT_FOLDER'], 'profiles')
+
+
+def store_profile(profile, trace, started):
+    # stores the cProfile statistics, which can be analyzed using pstats or snakeviz, and a JSON file with the spans
+    # of the evaluation stages including those executed in other threads
+    directory = profile_folder()
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    name = time.strftime('%Y%m%d-%H%M%S', time.gmtime(started)) + '-' + uuid.uuid4().hex[:8]
+    profile.dump_stats(os.path.join(directory, name + '.prof'))
+
+    summary = io.StringIO()
+    pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(30)
+    with open(os.path.join(directory, name + '.json'), 'w') as trace_file:
+        json.dump({'path': request.path, 'method': request.method, 'started': started,
+                   'duration': time.time() - started, 'spans': trace.spans,
+                   'topFunctions': summary.getvalue()}, trace_file, indent=2)
+    current_app.logger.info('Stored profile of request to ' + request.path + ' as ' + name)
+    remove_old_profiles(directory)
+    return name
+
+
+def remove_old_profiles(directory):
+    # keeps the files of the PROFILING_MAX_PROFILES most recent profiles
+    profiles = sorted((name for name in os.listdir(directory) if name.endswith('.prof')),
+                      key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+    profiles = [name[:-len('.prof')] for name in profiles]
+    for name in profiles[:max(0, len(profiles) - current_app.config['PROFILING_MAX_PROFILES'])]:
+        for extension in ('.prof', '.json'):
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                os.remove(path)
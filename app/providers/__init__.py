@@ -0,0 +1,36 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import importlib
+
+from flask import current_app
+
+from app.providers.base import Provider, ProviderError, fingerprint
+
+# implementations of the provider interface, selected by the PROVIDER setting
+PROVIDERS = {
+    'cloud': 'app.providers.cloud.CloudProvider',
+    'fake': 'app.providers.fake.FakeProvider',
+}
+
+
+def create_provider(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
+    # the implementations are only imported if they are used
+    module_name, class_name = PROVIDERS[current_app.config['PROVIDER']].rsplit('.', 1)
+    provider_class = getattr(importlib.import_module(module_name), class_name)
+    return provider_class(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region)
@@ -0,0 +1,64 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import hashlib
+from abc import ABC, abstractmethod
+
+
+class ProviderError(Exception):
+    # raised by providers if the devices or their status cannot be retrieved
+    pass
+
+
+class Provider(ABC):
+    # interface of the providers used for the discovery and the evaluation of the devices, one instance holds the
+    # clients of one combination of credentials and is reused by all requests with these credentials (see
+    # app.session_pool)
+
+    def __init__(self, ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
+        self.ibm_fingerprint = fingerprint(ibm_token or '')
+
+    @property
+    def aws_catalog_scope(self):
+        # key of the AWS device catalog in the device cache, the catalog does not depend on the credentials
+        return 'all'
+
+    @property
+    def ibm_catalog_scope(self):
+        # key of the IBMQ device catalog in the device cache, the backends depend on the IBMQ account
+        return self.ibm_fingerprint
+
+    @abstractmethod
+    def aws_devices(self):
+        # all online AWS devices providing arn, name, provider_name, status, type, and properties like AwsDevice
+        pass
+
+    @abstractmethod
+    def ibm_backends(self):
+        # all IBMQ backends providing name() and configuration() like IBMQBackend
+        pass
+
+    @abstractmethod
+    def pending_jobs(self, backend_name):
+        # number of jobs in the queue of the given IBMQ backend
+        pass
+
+
+def fingerprint(*credentials):
+    # credentials are never used as keys directly to avoid keeping them in logs or dumps of the pool
+    return hashlib.sha256('\0'.join(credentials).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,109 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from braket.aws import AwsDevice, AwsSession
+from qiskit.providers.ibmq import IBMQFactory
+from flask import current_app
+
+from app.providers.base import Provider
+
+IBMQ_AUTH_URL = 'https://auth.quantum-computing.ibm.com/api'
+
+# the per-device fetches of the discovery are bounded by a separate pool to avoid that the provider lookups block
+# all threads while waiting for their own fetches, the pool is created on first use as its size is configured by the
+# application
+_fetch_executor = None
+
+
+class CloudProvider(Provider):
+    # Amazon Braket and IBMQ, the clients are created on first use and no process-global state such as os.environ
+    # or the IBMQ account is modified
+
+    def __init__(self, ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
+        super(CloudProvider, self).__init__(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region)
+        self._ibm_token = ibm_token
+        self._aws_access_key_id = aws_access_key_id
+        self._aws_secret_access_key = aws_secret_access_key
+        self._aws_region = aws_region
+        self._aws_sessions = {}
+        self._ibm_provider = None
+        # logging in to IBMQ must not block the creation of the AWS sessions
+        self._aws_lock = threading.Lock()
+        self._ibm_lock = threading.Lock()
+
+    def aws_session(self, region=None):
+        # one Braket session per region, the sessions of other regions share the credentials of the default region
+        region = region or self._aws_region
+        with self._aws_lock:
+            session = self._aws_sessions.get(region)
+            if session is None:
+                if self._aws_region in self._aws_sessions:
+                    session = AwsSession.copy_session(self._aws_sessions[self._aws_region], region)
+                else:
+                    session = AwsSession(boto3.Session(aws_access_key_id=self._aws_access_key_id,
+                                                       aws_secret_access_key=self._aws_secret_access_key,
+                                                       region_name=region))
+                self._aws_sessions[region] = session
+            return session
+
+    def ibm_provider(self):
+        # each instance uses its own factory, thus, concurrent requests with different tokens do not interfere
+        with self._ibm_lock:
+            if self._ibm_provider is None:
+                current_app.logger.info('Authenticating to IBMQ with account ' + self.ibm_fingerprint)
+                self._ibm_provider = IBMQFactory().enable_account(self._ibm_token, url=IBMQ_AUTH_URL, hub='ibm-q',
+                                                                  group='open', project='main')
+            return self._ibm_provider
+
+    def aws_devices(self):
+        # get all online AwsDevices, in contrast to AwsDevice.get_devices the regions are searched and the properties
+        # of the devices are loaded concurrently instead of one after another
+        aws_session = self.aws_session()
+        sessions = [self.aws_session(region) for region in AwsDevice.REGIONS]
+
+        # simulators are only instantiated in the same region as the AWS session
+        fetch_executor = _get_fetch_executor()
+        searches = [fetch_executor.submit(session.search_devices, statuses=['ONLINE'],
+                                          types=['QPU', 'SIMULATOR'] if session is aws_session else ['QPU'])
+                    for session in sessions]
+        device_arns = {}
+        for session, search in zip(sessions, searches):
+            for result in search.result():
+                device_arns.setdefault(result['deviceArn'], session)
+
+        devices = list(fetch_executor.map(lambda item: AwsDevice(item[0], item[1]), device_arns.items()))
+        devices.sort(key=lambda device: device.name)
+        return devices
+
+    def ibm_backends(self):
+        return self.ibm_provider().backends()
+
+    def pending_jobs(self, backend_name):
+        return self.ibm_provider().get_backend(backend_name).status().pending_jobs
+
+
+def _get_fetch_executor():
+    global _fetch_executor
+    if _fetch_executor is None:
+        _fetch_executor = ThreadPoolExecutor(max_workers=current_app.config['DISCOVERY_MAX_WORKERS'],
+                                             thread_name_prefix='device-fetch')
+    return _fetch_executor
@@ -0,0 +1,184 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import functools
+import random
+import time
+
+from braket.aws import AwsDeviceType
+from braket.device_schema.simulators import GateModelSimulatorDeviceCapabilities
+from flask import current_app
+
+from app.providers.base import Provider, ProviderError
+
+# execution windows of the synthetic devices, most devices are always available like the simulators
+EXECUTION_WINDOWS = [
+    [('Everyday', '00:00', '23:59')],
+    [('Everyday', '00:00', '23:59')],
+    [('Weekdays', '09:00', '17:00')],
+    [('Weekdays', '22:00', '06:00')],
+    [('Weekend', '00:00', '23:59')],
+    [('Monday', '13:00', '18:00'), ('Thursday', '08:00', '12:30')],
+    [('Tuesday', '00:00', '12:00'), ('Friday', '12:00', '23:59')],
+]
+
+# share of the AWS devices which are simulators and annealers, the latter are removed by the gate model filter
+SIMULATOR_SHARE = 0.2
+ANNEALER_SHARE = 0.05
+
+
+class FakeProvider(Provider):
+    # in-process provider with synthetic catalogs of the size given by the configuration, e.g., to measure the scaling
+    # of the evaluation without cloud accounts. Each call is delayed by FAKE_PROVIDER_LATENCY seconds and fails with
+    # the probability FAKE_PROVIDER_FAILURE_RATE.
+
+    def __init__(self, ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
+        super(FakeProvider, self).__init__(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region)
+        self._random = random.Random()
+
+    # the configuration is read on each call, thus, benchmarks can change it while the provider is pooled
+    @property
+    def aws_device_count(self):
+        return current_app.config['FAKE_PROVIDER_AWS_DEVICES']
+
+    @property
+    def ibm_backend_count(self):
+        return current_app.config['FAKE_PROVIDER_IBM_BACKENDS']
+
+    @property
+    def seed(self):
+        return current_app.config['FAKE_PROVIDER_SEED']
+
+    @property
+    def aws_catalog_scope(self):
+        # synthetic catalogs must never be served to the cloud provider or catalogs of other sizes
+        return 'fake-' + '-'.join(str(value) for value in (self.seed, self.aws_device_count))
+
+    @property
+    def ibm_catalog_scope(self):
+        return 'fake-' + '-'.join(str(value) for value in (self.seed, self.ibm_backend_count, self.ibm_fingerprint))
+
+    def aws_devices(self):
+        self._call('AWS devices')
+        return list(generate_aws_devices(self.seed, self.aws_device_count))
+
+    def ibm_backends(self):
+        self._call('IBMQ backends')
+        return list(generate_ibm_backends(self.seed, self.ibm_backend_count))
+
+    def pending_jobs(self, backend_name):
+        self._call('status of ' + backend_name)
+        # the queue of each backend varies around its synthetic base value
+        base = _base_pending_jobs(self.seed, self.ibm_backend_count)[backend_name]
+        return max(0, base + self._random.randint(-base // 4, base // 4))
+
+    def _call(self, operation):
+        if current_app.config['FAKE_PROVIDER_LATENCY']:
+            time.sleep(current_app.config['FAKE_PROVIDER_LATENCY'])
+        if self._random.random() < current_app.config['FAKE_PROVIDER_FAILURE_RATE']:
+            raise ProviderError('Synthetic failure while retrieving ' + operation)
+
+
+class FakeAwsDevice(object):
+    # provides the attributes of AwsDevice which are used by the device cache
+
+    def __init__(self, arn, name, provider_name, device_type, properties):
+        self.arn = arn
+        self.name = name
+        self.provider_name = provider_name
+        self.status = 'ONLINE'
+        self.type = device_type
+        self.properties = properties
+
+
+class FakeIbmBackend(object):
+    # provides the methods of IBMQBackend which are used during the evaluation
+
+    def __init__(self, name, simulator, base_pending_jobs):
+        self._name = name
+        self._configuration = _FakeBackendConfiguration(simulator)
+        self.base_pending_jobs = base_pending_jobs
+
+    def name(self):
+        return self._name
+
+    def configuration(self):
+        return self._configuration
+
+
+class _FakeBackendConfiguration(object):
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+
+@functools.lru_cache(maxsize=8)
+def generate_aws_devices(seed, count):
+    # the catalog only depends on the seed and the number of devices, thus, it is generated once per process
+    generator = random.Random(seed)
+    devices = []
+    for index in range(count):
+        draw = generator.random()
+        if draw < SIMULATOR_SHARE:
+            device_type, kind = AwsDeviceType.SIMULATOR, 'gate-model simulator'
+            windows = EXECUTION_WINDOWS[0]
+            cost = {'price': round(generator.uniform(0.075, 0.275), 3), 'unit': 'minute'}
+        else:
+            device_type = AwsDeviceType.QPU
+            kind = 'quantum annealer' if draw < SIMULATOR_SHARE + ANNEALER_SHARE else 'gate-model QPU'
+            windows = generator.choice(EXECUTION_WINDOWS)
+            cost = {'price': round(generator.uniform(0.0001, 0.03), 5), 'unit': 'shot'}
+        name = 'Fake-' + ('SIM' if device_type == AwsDeviceType.SIMULATOR else 'QPU') + '-' + str(index).zfill(4)
+        arn = 'arn:aws:braket:us-east-1::device/' + device_type.value.lower() + '/fake/' + name
+        properties = _device_capabilities(kind, windows, cost, generator.randint(5, 80))
+        devices.append(FakeAwsDevice(arn, name, 'Fake', device_type, properties))
+    return tuple(devices)
+
+
+@functools.lru_cache(maxsize=8)
+def generate_ibm_backends(seed, count):
+    generator = random.Random(seed)
+    return tuple(FakeIbmBackend('fake_backend_' + str(index).zfill(4), generator.random() < SIMULATOR_SHARE,
+                                generator.randint(0, 400))
+                 for index in range(count))
+
+
+@functools.lru_cache(maxsize=8)
+def _base_pending_jobs(seed, count):
+    return {backend.name(): backend.base_pending_jobs for backend in generate_ibm_backends(seed, count)}
+
+
+def _device_capabilities(kind, windows, cost, qubit_count):
+    return GateModelSimulatorDeviceCapabilities.parse_obj({
+        'braketSchemaHeader': {'name': 'braket.device_schema.simulators.gate_model_simulator_device_capabilities',
+                               'version': '1'},
+        'service': {
+            'braketSchemaHeader': {'name': 'braket.device_schema.device_service_properties', 'version': '1'},
+            'executionWindows': [{'executionDay': day, 'windowStartHour': start, 'windowEndHour': end}
+                                 for day, start, end in windows],
+            'shotsRange': [1, 100000],
+            'deviceCost': cost,
+            'deviceDocumentation': {'imageUrl': '', 'summary': 'Synthetic ' + kind, 'externalDocumentationUrl': ''},
+            'deviceLocation': 'us-east-1',
+            'updatedAt': '2023-01-01T00:00:00'},
+        'action': {'braket.ir.openqasm.program': {'actionType': 'braket.ir.openqasm.program', 'version': ['1'],
+                                                  'supportedOperations': ['h', 'cnot', 'rx', 'rz']}},
+        'paradigm': {'braketSchemaHeader': {
+            'name': 'braket.device_schema.simulators.gate_model_simulator_paradigm_properties', 'version': '1'},
+            'qubitCount': qubit_count},
+        'deviceParameters': {}})
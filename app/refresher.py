@@ -0,0 +1,166 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import time
+from datetime import timedelta
+
+from flask import Blueprint, current_app
+from redis.exceptions import RedisError
+
+from app import device_cache, session_pool
+from app.policy_evaluation import queue_depth
+
+# the device refresher keeps the snapshot of the devices in Redis up to date, thus, the requests do not have to query
+# the providers. It runs as jobs on its own queue, thus, its jobs do not wait behind the evaluations of the request
+# queue, and the rq worker of this queue has to be started with --with-scheduler. Each job refreshes one part of the
+# snapshot and schedules its next execution: the interval is shortened if the part changed and extended otherwise,
+# within the bounds configured for the part
+STATE_KEY = 'policy-handler:refresher'
+JOB_ID_PREFIX = 'policy-handler-refresher:'
+
+blueprint = Blueprint('refresher', __name__, cli_group=None)
+
+# parts of the snapshot and the jobs refreshing them
+JOBS = {
+    'aws-catalog': 'app.refresher.refresh_aws_catalog',
+    'queue-depth': 'app.refresher.refresh_queue_depths',
+}
+
+# factors applied to the interval if the refreshed part changed or not
+SHORTEN_FACTOR = 0.5
+EXTEND_FACTOR = 1.5
+# a change of the queue size of a backend by at most this fraction of its previous size is not considered a change
+QUEUE_DEPTH_TOLERANCE = 0.1
+
+
+def refresh_aws_catalog():
+    # the catalog contains the status, the execution windows, and the prices of the devices
+    def refresh():
+        session = _session()
+        version = device_cache.catalog_version('aws', session.aws_catalog_scope)
+        device_cache.refresh_aws_devices(session.aws_catalog_scope, session.aws_devices)
+        return device_cache.catalog_version('aws', session.aws_catalog_scope) != version
+
+    _run('aws-catalog', refresh)
+
+
+def refresh_queue_depths():
+    # polls the backends of the IBMQ catalogs of all accounts which used the policy handler
+    def refresh():
+        names = device_cache.ibm_backend_names()
+        previous = dict(zip(names, current_app.redis.mget([queue_depth.QUEUE_DEPTH_PREFIX + name for name in names]))) \
+            if names else {}
+        pending_jobs = queue_depth.poll_pending_jobs(names, _session())
+        # the values outlive the next refresh, if the refresher stops, the requests poll the backends again
+        queue_depth.store_pending_jobs(pending_jobs, 2 * _bounds('queue-depth')[1])
+        return any(previous.get(name) is None or
+                   abs(value - int(previous[name])) > QUEUE_DEPTH_TOLERANCE * int(previous[name])
+                   for name, value in pending_jobs.items())
+
+    _run('queue-depth', refresh)
+
+
+def start():
+    # refreshes all parts of the snapshot immediately, the jobs of a part always have the same ID, thus, the queued or
+    # scheduled job of a previous start is replaced instead of starting a second chain of jobs
+    queue = current_app.refresher_queue
+    for part, job in JOBS.items():
+        queue.scheduled_job_registry.remove(JOB_ID_PREFIX + part)
+        queue.remove(JOB_ID_PREFIX + part)
+        # the job hash is shared by the running job and its next execution, thus, it is kept after the job succeeded
+        # instead of being deleted together with the next execution
+        queue.enqueue(job, job_id=JOB_ID_PREFIX + part, result_ttl=-1)
+    current_app.logger.info('Started device refresher for ' + ', '.join(JOBS))
+
+
+def is_running(part):
+    # whether the part was refreshed successfully within its maximal interval, i.e., its chain of jobs is not broken
+    try:
+        refreshed_at = current_app.redis.hget(STATE_KEY, part + ':refreshedAt')
+    except RedisError:
+        return False
+    return refreshed_at is not None and time.time() - float(refreshed_at) <= _bounds(part)[1]
+
+
+def status():
+    # version of the catalog of Amazon Braket and, for each part, the time of the last successful refresh, whether it
+    # changed, and the current interval in seconds
+    state = {field.decode('utf-8'): value.decode('utf-8')
+             for field, value in current_app.redis.hgetall(STATE_KEY).items()}
+    snapshot = {'enabled': current_app.config['DEVICE_REFRESHER_ENABLED'],
+                'version': device_cache.catalog_version('aws', _session().aws_catalog_scope)}
+    for part in JOBS:
+        if part + ':refreshedAt' in state:
+            snapshot[part] = {'refreshedAt': float(state[part + ':refreshedAt']),
+                              'changed': state[part + ':changed'] == 'true',
+                              'interval': float(state[part + ':interval'])}
+    return snapshot
+
+
+def _run(part, refresh):
+    # executed by the rq worker outside of a request, thus, the application context is pushed here. Failed refreshes
+    # are retried after the minimal interval, the next refresh is always scheduled, the time of the refresh is only
+    # updated if it succeeded
+    from app import app
+
+    with app.app_context():
+        changed = failed = True
+        try:
+            changed = refresh()
+            failed = False
+        except Exception:
+            current_app.logger.exception('Refreshing ' + part + ' failed')
+        finally:
+            minimum, maximum = _bounds(part)
+            previous = current_app.redis.hget(STATE_KEY, part + ':interval')
+            interval = float(previous) * (SHORTEN_FACTOR if changed else EXTEND_FACTOR) if previous else minimum
+            interval = minimum if failed else min(maximum, max(minimum, interval))
+            state = {part + ':interval': interval, part + ':changed': 'true' if changed else 'false'}
+            if not failed:
+                state[part + ':refreshedAt'] = time.time()
+            current_app.redis.hset(STATE_KEY, mapping=state)
+            current_app.refresher_queue.enqueue_in(timedelta(seconds=interval), JOBS[part], job_id=JOB_ID_PREFIX + part,
+                                                   result_ttl=-1)
+            current_app.logger.info('Refreshed ' + part + (' with' if changed else ' without') +
+                                    ' changes, next refresh in ' + str(int(interval)) + 's')
+
+
+def _bounds(part):
+    name = part.upper().replace('-', '_')
+    return current_app.config['REFRESH_INTERVAL_MIN_' + name], current_app.config['REFRESH_INTERVAL_MAX_' + name]
+
+
+def _session():
+    # the refresher uses its own credentials, the catalog of Amazon Braket and the queue sizes do not depend on them
+    config = current_app.config
+    return session_pool.get_session(config['REFRESHER_IBMQ_TOKEN'], config['REFRESHER_AWS_ACCESS_KEY'],
+                                    config['REFRESHER_AWS_SECRET_ACCESS_KEY'], 'us-east-1')
+
+
+@blueprint.cli.command('start-refresher')
+def start_refresher_command():
+    # flask start-refresher, executed before the rq worker is started
+    if not current_app.config['DEVICE_REFRESHER_ENABLED']:
+        current_app.logger.info('Device refresher is disabled, set DEVICE_REFRESHER_ENABLED=true to start it')
+        return
+    credentials = ('REFRESHER_IBMQ_TOKEN', 'REFRESHER_AWS_ACCESS_KEY', 'REFRESHER_AWS_SECRET_ACCESS_KEY')
+    if current_app.config['PROVIDER'] == 'cloud' and not all(current_app.config[name] for name in credentials):
+        current_app.logger.warning('Device refresher is not started, ' + ', '.join(credentials) + ' have to be set')
+        return
+    start()
@@ -27,6 +27,9 @@ class Result(db.Model):
     agent = db.Column('agent', LargeBinary)
     error = db.Column(db.String(1200), default="")
     complete = db.Column(db.Boolean, default=False)
+    evaluation = db.Column(db.Text)
+    # HTTP status code of the response to a failed evaluation
+    status_code = db.Column(db.Integer)
 
     def __repr__(self):
         return 'Result {}'.format(self.complete)
@@ -17,29 +17,126 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from app import app
-from flask import jsonify, abort, request, send_from_directory, url_for
+from app import db, device_cache, job_credentials, metrics, refresher, single_flight, upload_store
+from flask import Blueprint, jsonify, abort, request, send_file, send_from_directory, url_for, make_response, g, \
+    current_app
+import hashlib
 import os
 import json
+import uuid
 
-from app.policy_evaluation.availability_evaluation import evaluate_availability_aws, \
-    evaluate_availability_qiskit
-from app.utils import add_devices_for_evaluation, authenticate, compute_aws_devices
-from app.policy_evaluation.privacy_evaluation import evaluate_privacy_qiskit, evaluate_privacy_aws
-from app.policy_evaluation.money_evaluation import calculate_costs, calculate_costs_aws, calculate_costs_qiskit
-import string
-import random
+from app.policy_evaluation import analysis_cache
+from app.policy_evaluation.ranking import parse_k, rank_devices, to_list
+from app.policy_evaluation.program_source import StoredProgramSource
+from app.result_model import Result
+from app.profiling import profiled, profile_folder
+import time
 
+blueprint = Blueprint('api', __name__)
 
-@app.route('/policy-handler/api/v1.0/design-time-evaluation-hybrid-runtime', methods=['POST'])
+
+@blueprint.route('/policy-handler/api/v1.0/design-time-evaluation-hybrid-runtime', methods=['POST'])
+@profiled
 def design_time_evaluation_hybrid_runtime():
-    app.logger.info('Received request for hybrid runtime evaluation...')
+    # the evaluation modules import braket, qiskit, and numpy, thus, they are loaded on the first request
+    from app.evaluation import evaluate_design_time
+
+    current_app.logger.info('Received request for hybrid runtime evaluation...')
+    return evaluate_design_time(**extract_design_time_input())
+
+
+@blueprint.route('/policy-handler/api/v1.0/design-time-evaluation-hybrid-runtime/jobs', methods=['POST'])
+def enqueue_design_time_evaluation_hybrid_runtime():
+    current_app.logger.info('Received request for asynchronous hybrid runtime evaluation...')
+    evaluation_input = extract_design_time_input()
+
+    # the result entry has to exist before the worker starts, thus, it is created with the job ID upfront
+    result = Result(id=str(uuid.uuid4()))
+    db.session.add(result)
+    db.session.commit()
+    # the arguments of the job are stored in Redis until the job is completed, thus, the credentials are encrypted
+    current_app.queue.enqueue_call(func='app.tasks.execute_design_time_evaluation',
+                                   kwargs=job_credentials.seal(evaluation_input), job_id=result.id, result_ttl=0)
+
+    location = url_for('.get_result', result_id=result.id)
+    current_app.logger.info('Enqueued evaluation, result available via URL: ' + str(location))
+    return jsonify({'Location': location}), 202, {'Location': location}
+
+
+@blueprint.route('/policy-handler/api/v1.0/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    result = Result.query.get_or_404(result_id)
+    return jsonify({'id': result.id, 'complete': result.complete, 'error': result.error,
+                    'evaluation': url_for('.get_evaluation', result_id=result.id)})
+
+
+@blueprint.route('/policy-handler/api/v1.0/results/<result_id>/evaluation', methods=['GET'])
+def get_evaluation(result_id):
+    # returns the same response as the synchronous evaluation once the job is completed
+    result = Result.query.get_or_404(result_id)
+    if not result.complete:
+        return jsonify({'id': result.id, 'complete': False}), 202
+    if result.error:
+        # e.g., 400 if the shots of the programs can only be determined at runtime
+        status_code = result.status_code or 500
+        return make_response(jsonify({'error': result.error, 'statusCode': str(status_code)}), status_code)
+    return result.evaluation
+
+
+@blueprint.route('/policy-handler/api/v1.0/batch-evaluation', methods=['POST'])
+@profiled
+def batch_evaluation():
+    # evaluates a list of policy sets against one device snapshot and returns one evaluation per policy set in the
+    # format of the design time evaluation
+    from app.evaluation import PolicySet, evaluate_policy_sets
+
+    current_app.logger.info('Received request for batch evaluation...')
+    if not request.form.get('policySets'):
+        current_app.logger.info('No policy sets provided for batch evaluation')
+        abort(400)
+    try:
+        policy_sets = json.loads(request.form.get('policySets'))
+    except ValueError:
+        current_app.logger.info('Policy sets are not valid JSON')
+        abort(400)
+    if not isinstance(policy_sets, list) or not policy_sets:
+        current_app.logger.info('Policy sets must be a non-empty list')
+        abort(400)
+    try:
+        policy_sets = [PolicySet.from_json(policy_set) for policy_set in policy_sets]
+    except (AttributeError, KeyError, TypeError):
+        current_app.logger.info('Invalid policy set in batch evaluation')
+        abort(400)
+    evaluation_input = extract_evaluation_input()
+    current_app.logger.info('Evaluating ' + str(len(policy_sets)) + ' policy sets')
+    return jsonify(evaluate_policy_sets(policy_sets=policy_sets, **evaluation_input))
+
+
+def extract_design_time_input():
     # extract required input data
     if not request.form.get('moneyPolicy') and not request.form.get('availabilityPolicy') \
             and not request.form.get('privacyPolicy') and not request.form.get('customEnvironmentPolicy') \
             and not request.form.get('awsKeys') and not request.form.get('ibmqToken') \
             and not request.files['requiredPrograms']:
-        app.logger.info('Not all required parameters available in request: ')
+        current_app.logger.info('Not all required parameters available in request: ')
+        abort(400)
+    money_policy = json.loads(request.form.get('moneyPolicy'))
+    privacy_policy = json.loads(request.form.get('privacyPolicy'))
+    availability_policy = json.loads(request.form.get('availabilityPolicy'))
+    custom_environment_policy = json.loads(request.form.get('customEnvironmentPolicy'))
+
+    evaluation_input = extract_evaluation_input()
+    evaluation_input.update({'money_policy': money_policy, 'privacy_policy': privacy_policy,
+                             'availability_policy': availability_policy,
+                             'custom_environment_policy': custom_environment_policy})
+    return evaluation_input
+
+
+def extract_evaluation_input():
+    # credentials, required programs, and number of devices shared by the design time and batch evaluation
+    if not request.form.get('awsKeys') or not request.form.get('ibmqToken') \
+            or 'requiredPrograms' not in request.files:
+        current_app.logger.info('Credentials or required programs missing in request')
         abort(400)
     ibmq_token = request.form.get('ibmqToken')
     ibmq_token = json.loads(ibmq_token)['ibmqToken']
@@ -47,143 +144,66 @@ def design_time_evaluation_hybrid_runtime():
     aws_access_key = data['awsKeys']["awsAccessKey"]
     aws_secret_access_key = data['awsKeys']["awsSecretAccessKey"]
 
-    # set to any region which supports Amazon Braket
-    aws_region = 'us-east-1'
-    authenticate(ibmq_token, aws_access_key, aws_secret_access_key, aws_region)
-    custom_environment_policy_set = False
-    money_policy_set = False
-    money_policy = json.loads(request.form.get('moneyPolicy'))
-    privacy_policy = json.loads(request.form.get('privacyPolicy'))
-    availability_policy = json.loads(request.form.get('availabilityPolicy'))
-    custom_environment_policy = json.loads(request.form.get('customEnvironmentPolicy'))
-    required_programs = request.files['requiredPrograms']
-    # store file with required programs in local file and forward path to the workers
-    directory = app.config["UPLOAD_FOLDER"]
-    app.logger.info('Storing file comprising required programs at folder: ' + str(directory))
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    randomString = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-    fileName = 'required-programs' + randomString + '.zip'
-    required_programs.save(os.path.join(directory, fileName))
-    url = url_for('download_uploaded_file', name=os.path.basename(fileName))
-    app.logger.info('File available via URL: ' + str(url))
-
-    # if this policy is specified the execution of the programs require a customized docker environment
-    # since Qiskit Runtime does not allow this, only devices from AWS are included in the selection
-    custom_environment_policy_set = False
-    simulators_allowed = True
-    if len(custom_environment_policy) > 1 or len(money_policy) > 1:
-        custom_environment_policy_set = True
-        simulators_allowed = False
+    # store file with required programs by the hash of its content and forward path to the workers
+    digest = upload_store.store(request.files['requiredPrograms'])
+    url = url_for('.download_uploaded_file', name=digest + upload_store.UPLOAD_SUFFIX)
+    current_app.logger.info('File available via URL: ' + str(url))
+    # the evaluation reads the stored file directly instead of downloading it again
+    program_source = StoredProgramSource(upload_store.upload_path(digest))
 
-    # compute all devices from each provider
-    devices, backends = add_devices_for_evaluation(ibmq_token, simulators_allowed, custom_environment_policy_set)
+    return {'ibmq_token': ibmq_token, 'aws_access_key': aws_access_key,
+            'aws_secret_access_key': aws_secret_access_key, 'program_source': program_source,
+            'k': extract_k(request.values.get('k'))}
 
 
-    if len(money_policy) == 1:
-        money_policy_set = True
-        money_policy_result = calculate_costs(devices, money_policy, url)
-        money_policy_weight = money_policy['moneyPolicy']['weight']
-    else:
-        money_policy_result = [0] * len(devices)
-        money_policy_weight = 0
-
-    # get queue size for ibm devices
-    # get execution window for aws devices
-    if len(availability_policy) == 1:
-        availability_policy_result_aws = evaluate_availability_aws(devices)
-        availability_policy_result_qiskit = evaluate_availability_qiskit(backends)
-        availability_policy_weight = availability_policy['availabilityPolicy']['weight']
-    else:
-        availability_policy_result_aws = [0] * len(devices)
-        availability_policy_result_qiskit = [0] * len(backends)
-        availability_policy_weight = 0
-
-    if len(privacy_policy) == 1:
-        data_retention_result_aws, third_party_qpu_result_aws = evaluate_privacy_aws(devices, privacy_policy)
-        data_retention_result_qiskit, third_party_qpu_result_qiskit = evaluate_privacy_aws(backends, privacy_policy)
-        privacy_policy_weight = privacy_policy['privacyPolicy']['weight']
-    else:
-        data_retention_result_aws = [0] * len(devices)
-        third_party_qpu_result_aws = [0] * len(devices)
-        data_retention_result_qiskit = [0] * len(backends)
-        third_party_qpu_result_qiskit = [0] * len(backends)
-        privacy_policy_weight = 0
+def extract_k(value):
+    # number of devices to return per runtime, only the best device is returned if it is not given
+    try:
+        return parse_k(value)
+    except ValueError:
+        current_app.logger.info('Invalid number of devices to return: ' + str(value))
+        abort(400)
 
-    # Ranking
-    combined_aws = []
-    for cost, time, data, third_party in zip(money_policy_result, availability_policy_result_aws,
-                                             data_retention_result_aws,
-                                             third_party_qpu_result_aws):
-        combined_aws.append([cost, time, data, third_party])
-    scores = [0] * len(devices)
 
-    multipliers = [money_policy_weight, availability_policy_weight, privacy_policy_weight, privacy_policy_weight]
-    counter = 0
-    for i in range(len(combined_aws)):
-        counter = 0
-        score = 0
-        for j in combined_aws[i]:
-            score += int(j) * int(multipliers[counter])
-            counter = counter + 1
-        scores[i] = score
-
-    result = []
-
-    for device, cost, time, data, third_party, score in zip(devices, money_policy_result, availability_policy_result_aws,
-                                                            data_retention_result_aws, third_party_qpu_result_aws, scores):
-        result.append(["AWS Runtime", device, cost, time, data, third_party, score])
-
-    if min(scores) < 0:
-        sorted_list = sorted(result, key=lambda x: x[5], reverse=True)
-    else:
-        sorted_list = sorted(result, key=lambda x: x[5])
-    if not custom_environment_policy_set and not money_policy_set:
-        combined_qiskit = []
-        for time, data, third_party in zip(availability_policy_result_qiskit,
-                                                 data_retention_result_qiskit,
-                                                 third_party_qpu_result_qiskit):
-            combined_qiskit.append([time, data, third_party])
-        scores_qiskit = [0] * len(backends)
-
-        multipliers = [availability_policy_weight, privacy_policy_weight, privacy_policy_weight]
-        counter = 0
-        for i in range(len(combined_qiskit)):
-            counter = 0
-            score = 0
-            for j in combined_qiskit[i]:
-                score += int(j) * int(multipliers[counter])
-                counter = counter + 1
-            scores_qiskit[i] = score
-        result = []
-
-        for device, time, data, third_party, score in zip(backends, availability_policy_result_qiskit,
-                                                                data_retention_result_qiskit,
-                                                                third_party_qpu_result_qiskit, scores_qiskit):
-            result.append(["Qiskit Runtime", device, time, data, third_party, score])
-
-        if min(scores_qiskit) < 0:
-            sorted_list_qiskit = sorted(result, key=lambda x: x[5], reverse=True)
-        else:
-            sorted_list_qiskit = sorted(result, key=lambda x: x[5])
-        if min(scores_qiskit) > min(scores):
-            return "Qiskit Runtime"
-        if min(scores_qiskit) < min(scores):
-            return "AWS Runtime"
-        if min(scores_qiskit) == min(scores):
-            return "Tie"
-
-    return json.dumps(sorted_list[0])
-
-
-@app.route('/policy-handler/api/v1.0/runtime-evaluation-hybrid-runtime', methods=['POST'])
+@blueprint.route('/policy-handler/api/v1.0/runtime-evaluation-hybrid-runtime', methods=['POST'])
+@profiled
 def runtime_evaluation_hybrid_runtime():
-    app.logger.info('Received request for hybrid runtime evaluation...')
-    app.logger.info(request.data)
+    # identical requests arriving together, e.g., from the instances of a deployed workflow, share one evaluation
+    return single_flight.coalesce('runtime:' + runtime_request_key(), evaluate_runtime_request)
+
+
+def runtime_request_key():
+    # hash of the request, thus, the credentials it contains are not written to Redis
+    try:
+        content = json.dumps(json.loads(request.data), sort_keys=True)
+    except ValueError:
+        content = request.get_data(as_text=True)
+    content += '\0' + str(request.args.get('k'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def evaluate_runtime_request():
+    from app.policy_evaluation.availability_evaluation import evaluate_availability_aws, \
+        evaluate_availability_qiskit
+    from app.utils import authenticate, compute_aws_devices
+    from app.policy_evaluation.privacy_evaluation import evaluate_privacy_qiskit, evaluate_privacy_aws
+    from app.policy_evaluation.money_evaluation import calculate_costs_aws, calculate_costs_qiskit
+    from app.policy_evaluation.scoring import score_devices
+
+    current_app.logger.info('Received request for hybrid runtime evaluation...')
+    current_app.logger.info(request.data)
     json_data = json.loads(request.data)
     policy_set = False
     custom_environment_policy_set = False
-    availability_policy = False
+    devices = []
+    money_policy = None
+    availability_policy = None
+    privacy_policy = None
+    custom_environment_policy = None
+    ibmq_token = None
+    aws_access_key = None
+    aws_secret_access_key = None
+    aws_region = "us-east-1"
     simulators_allowed = False
     money_policy_weight = 0
     availability_policy_weight = 0
@@ -191,12 +211,12 @@ def runtime_evaluation_hybrid_runtime():
     availability_policy_set = False
     if 'devices' in json_data:
         devices = json_data['devices']
-        devices = devices.split(',')
+        devices = [device for device in devices.split(',') if device]
     if 'money' in json_data:
         # 'moneyPolicy' key exists in the JSON object
         money_policy = json_data['money']
-        json_money = json.loads(money_policy)
-        money_policy = json_money
+        if money_policy is not None:
+            money_policy = json.loads(money_policy)
         if money_policy is not None:
             policy_set = True
             money_policy_weight = money_policy['moneyWeight']
@@ -227,24 +247,25 @@ def runtime_evaluation_hybrid_runtime():
     if 'simulatorsAllowed' in json_data:
         simulators_allowed = json_data['simulatorsAllowed']
     if not policy_set:
-        app.logger.info('No policy provided for evaluation')
+        current_app.logger.info('No policy provided for evaluation')
         abort(400)
+    k = extract_k(json_data.get('k', request.args.get('k')))
     if 'ibmqToken' not in json_data and 'awsAccessKey' not in json_data and 'awsSecretAccessKey' not in json_data:
-        app.logger.info("Some credentials are missing")
+        current_app.logger.info("Some credentials are missing")
         abort(400)
 
-    app.logger.info('Received request for hybrid runtime evaluation...')
-    authenticate(ibmq_token, aws_access_key, aws_secret_access_key, aws_region)
-    aws_devices = compute_aws_devices(simulators_allowed)
+    current_app.logger.info('Received request for hybrid runtime evaluation...')
+    session = authenticate(ibmq_token, aws_access_key, aws_secret_access_key, aws_region)
+    aws_devices = compute_aws_devices(session, simulators_allowed)
     # no QPU is detected from NISQ, we only deal with AWS devices then
     if len(devices) == 0:
-        app.logger.info('NISQ did not detect any devices')
+        current_app.logger.info('NISQ did not detect any devices')
         custom_environment_policy_set = True
         devices = aws_devices
 
     # if this policy is specified the execution of the programs require a customized docker environment
     # since Qiskit Runtime does not allow this, AWS Runtime is returned
-    if custom_environment_policy is not 'null':
+    if custom_environment_policy_set:
         devices = aws_devices
 
     if money_policy is not None:
@@ -252,14 +273,21 @@ def runtime_evaluation_hybrid_runtime():
         sumExecutionTimeQuantum = money_policy['sumExecutionTimeQuantum']
         sumNumberOfQuantumShots = money_policy['sumNumberOfQuantumShots']
         sumNumberOfQuantumTasks = money_policy['sumNumberOfQuantumTaks']
-        money_policy_result_qiskit = calculate_costs_qiskit(sumExecutionTimeClassical, sumExecutionTimeQuantum, devices)
+        money_policy_result_qiskit = calculate_costs_qiskit(sumExecutionTimeClassical, sumExecutionTimeQuantum, devices,
+                                                            session)
         money_policy_result_aws = calculate_costs_aws(sumExecutionTimeClassical, sumExecutionTimeQuantum,
                                                       sumNumberOfQuantumShots, sumNumberOfQuantumTasks, aws_devices)
+    else:
+        money_policy_result_qiskit = [0] * len(devices)
+        money_policy_result_aws = [0] * len(aws_devices)
 
     if availability_policy is not None:
         availability_policy_result_aws = evaluate_availability_aws(aws_devices)
         if not custom_environment_policy_set:
-            availability_policy_result_qiskit = evaluate_availability_qiskit(devices)
+            availability_policy_result_qiskit = evaluate_availability_qiskit(devices, session)
+    else:
+        availability_policy_result_aws = [0] * len(aws_devices)
+        availability_policy_result_qiskit = [0] * len(devices)
     if privacy_policy is not None:
         if not custom_environment_policy_set:
             data_retention_result_qiskit, third_party_qpu_result_qiskit = evaluate_privacy_qiskit(devices,
@@ -268,98 +296,134 @@ def runtime_evaluation_hybrid_runtime():
     else:
         data_retention_result_aws = [0] * len(aws_devices)
         third_party_qpu_result_aws = [0] * len(aws_devices)
-        data_retention_result_aws = [0] * len(devices)
-        third_party_qpu_result_aws = [0] * len(devices)
+        data_retention_result_qiskit = [0] * len(devices)
+        third_party_qpu_result_qiskit = [0] * len(devices)
 
-    aws_scores = [0] * len(aws_devices)
     # Ranking
-    combined_aws = []
-    for cost, time, data, third_party in zip(money_policy_result_aws, availability_policy_result_aws,
-                                             data_retention_result_aws,
-                                             third_party_qpu_result_aws):
-        combined_aws.append([cost, time, data, third_party])
-    aws_scores = [0] * len(aws_devices)
-    if custom_environment_policy_set:
-        combined_qiskit = []
-        for cost, time, data, third_party in zip(money_policy_result_qiskit, availability_policy_result_qiskit,
-                                                 data_retention_result_qiskit,
-                                                 third_party_qpu_result_qiskit):
-            combined_qiskit.append([cost, time, data, third_party])
-        qiskit_scores = [0] * len(devices)
-
     multipliers = [money_policy_weight, availability_policy_weight, privacy_policy_weight, privacy_policy_weight]
-
-    for i in range(len(combined_aws)):
-        counter = 0
-        score = 0
-        for j in combined_aws[i]:
-            score += int(j) * int(multipliers[counter])
-            counter = counter + 1
-        aws_scores[i] = score
-
-    aws_result = []
-    combined_qiskit = []
-    for i in range(len(combined_qiskit)):
-        counter = 0
-        score = 0
-        for j in combined_qiskit[i]:
-            score += int(j) * int(multipliers[counter])
-            counter = counter + 1
-        qiskit_scores[i] = score
-
-    qiskit_result = []
-
-    for device, cost, time, data, third_party, score in zip(aws_devices, money_policy_result_aws,
-                                                            availability_policy_result_aws,
-                                                            data_retention_result_aws, third_party_qpu_result_aws,
-                                                            aws_scores):
-        aws_result.append([device, cost, time, data, third_party, score])
-
-    for device, cost, time, data, third_party, score in zip(aws_devices, money_policy_result_qiskit,
-                                                            availability_policy_result_qiskit,
-                                                            data_retention_result_qiskit, third_party_qpu_result_qiskit,
-                                                            qiskit_scores):
-        qiskit_result.append([device, cost, time, data, third_party, score])
-
-    if min(aws_scores) < 0:
-        sorted_list_aws = sorted(aws_result, key=lambda x: x[4], reverse=True)
-    else:
-        sorted_list_aws = sorted(aws_result, key=lambda x: x[4])
-
-    if min(qiskit_scores) < 0:
-        sorted_list_qiskit = sorted(qiskit_result, key=lambda x: x[4], reverse=True)
-    else:
-        sorted_list_qiskit = sorted(qiskit_result, key=lambda x: x[4])
-
-    best_aws_result = aws_scores[0]
+    aws_scores = score_devices([money_policy_result_aws, availability_policy_result_aws, data_retention_result_aws,
+                                third_party_qpu_result_aws], multipliers).tolist()
+    qiskit_scores = []
+    if not custom_environment_policy_set:
+        qiskit_scores = score_devices([money_policy_result_qiskit, availability_policy_result_qiskit,
+                                       data_retention_result_qiskit, third_party_qpu_result_qiskit],
+                                      multipliers).tolist()
+
+    # devices contains the names of the IBMQ backends selected by NISQ
+    aws_ranking = rank_devices(aws_devices, {'cost': money_policy_result_aws,
+                                             'availability': availability_policy_result_aws,
+                                             'dataRetention': data_retention_result_aws,
+                                             'thirdPartyQPU': third_party_qpu_result_aws}, aws_scores, k or 1)
+    qiskit_ranking = []
+    if not custom_environment_policy_set:
+        qiskit_ranking = rank_devices(devices, {'cost': money_policy_result_qiskit,
+                                                'availability': availability_policy_result_qiskit,
+                                                'dataRetention': data_retention_result_qiskit,
+                                                'thirdPartyQPU': third_party_qpu_result_qiskit}, qiskit_scores, k or 1)
+    if k is not None:
+        # top-k devices of each runtime with the values of all criteria, e.g., to select fallbacks
+        return json.dumps({'rankings': {'AWS Runtime': aws_ranking, 'Qiskit Runtime': qiskit_ranking}})
+
+    # devices with an unknown value are not ranked, the runtime with devices wins if the other has none
+    if not aws_ranking and not qiskit_ranking:
+        return json.dumps([])
+    best_aws_result = aws_ranking[0]['score'] if aws_ranking else None
     best_results = []
-    if custom_environment_policy_set:
-        best_qiskit_result = qiskit_scores[0]
+    if not custom_environment_policy_set:
+        if not aws_ranking or not qiskit_ranking:
+            return json.dumps(to_list((aws_ranking or qiskit_ranking)[0]))
+        best_qiskit_result = qiskit_ranking[0]['score']
         if best_aws_result > best_qiskit_result:
-            return json.dumps(sorted_list_aws[0])
+            return json.dumps(to_list(aws_ranking[0]))
         if best_aws_result < best_qiskit_result:
-            return json.dumps(sorted_list_qiskit[0])
+            return json.dumps(to_list(qiskit_ranking[0]))
         if best_aws_result == best_qiskit_result:
-            return json.dumps([sorted_list_qiskit[0], sorted_list_aws[0]])
+            return json.dumps([to_list(qiskit_ranking[0]), to_list(aws_ranking[0])])
     if availability_policy_set:
-        best_qiskit_result = qiskit_scores[0]
+        best_qiskit_result = qiskit_ranking[0]['score'] if qiskit_ranking else None
         best_results.append(best_qiskit_result)
         best_results.append(best_aws_result)
         return json.dumps(best_results)
 
-    return json.dumps(sorted_list_aws[0])
+    return json.dumps(to_list(aws_ranking[0]))
 
 
-@app.route('/policy-handler/api/v1.0/uploads/<name>')
+@blueprint.route('/policy-handler/api/v1.0/uploads/<name>')
 def download_uploaded_file(name):
-    return send_from_directory(app.config["UPLOAD_FOLDER"], name)
+    digest = upload_store.parse_digest(name)
+    if digest is None:
+        # uploads stored before the content-addressed store was introduced
+        return send_from_directory(current_app.config["UPLOAD_FOLDER"], name)
+    path = upload_store.upload_path(digest)
+    if not os.path.exists(path):
+        abort(404)
+    # the content of an upload never changes, thus, the hash is used as ETag and conditional requests are answered
+    # with 304 Not Modified
+    return send_file(path, mimetype='application/zip', etag=digest, conditional=True)
+
+
+@blueprint.route('/policy-handler/api/v1.0/hybrid-programs/<name>')
+def download_generated_file(name):
+    return send_from_directory(current_app.config["RESULT_FOLDER"], name)
 
 
-@app.route('/policy-handler/api/v1.0/hybrid-programs/<name>')
-def download_generated_file(name):
-    return send_from_directory(app.config["RESULT_FOLDER"], name)
+@blueprint.route('/policy-handler/api/v1.0/profiles/<name>')
+def download_profile(name):
+    return send_from_directory(profile_folder(), name)
+
+
+@blueprint.route('/policy-handler/api/v1.0/device-cache', methods=['GET'])
+def get_device_cache_stats():
+    return jsonify(device_cache.cache_stats())
+
+
+@blueprint.route('/policy-handler/api/v1.0/device-cache', methods=['DELETE'])
+def invalidate_device_cache():
+    # optionally, only the catalog of one provider ('aws' or 'ibm') is invalidated
+    provider = request.args.get('provider')
+    if provider is not None and provider not in ('aws', 'ibm'):
+        abort(400)
+    return jsonify({'invalidated': device_cache.invalidate(provider)})
+
+
+@blueprint.route('/policy-handler/api/v1.0/device-snapshot', methods=['GET'])
+def get_device_snapshot():
+    return jsonify(refresher.status())
+
+
+@blueprint.route('/policy-handler/api/v1.0/shot-analysis-cache', methods=['GET'])
+def get_shot_analysis_cache_stats():
+    return jsonify(analysis_cache.cache_stats())
+
+
+@blueprint.route('/policy-handler/api/v1.0/decision-cache', methods=['GET'])
+def get_decision_cache_stats():
+    from app.policy_evaluation import decision_cache
+
+    return jsonify(decision_cache.cache_stats())
+
+
+@blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    body, content_type = metrics.render()
+    return body, 200, {'Content-Type': content_type}
+
+
+@blueprint.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@blueprint.after_app_request
+def record_request_duration(response):
+    # the route is used instead of the path to keep the number of label values bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    if 'request_started' in g and endpoint != '/metrics':
+        metrics.REQUEST_DURATION.labels(endpoint, request.method, response.status_code) \
+            .observe(time.perf_counter() - g.request_started)
+    return response
 
 
-@app.route('/policy-handler/api/v1.0/version', methods=['GET'])
+@blueprint.route('/policy-handler/api/v1.0/version', methods=['GET'])
 def version():
     return jsonify({'version': '1.0'})
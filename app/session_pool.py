@@ -0,0 +1,59 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.providers import create_provider, fingerprint
+
+# providers of the recently used credentials with the time of their last use, ordered from least to most recently
+# used, each provider holds the authenticated clients of its credentials (see app.providers)
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_session(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
+    key = (current_app.config['PROVIDER'],
+           fingerprint(ibm_token or '', aws_access_key_id or '', aws_secret_access_key or '', aws_region))
+    now = time.monotonic()
+    with _lock:
+        _expire(now)
+        entry = _sessions.get(key)
+        if entry is None:
+            entry = _sessions[key] = [create_provider(ibm_token, aws_access_key_id, aws_secret_access_key,
+                                                      aws_region), now]
+            # evict the least recently used sessions
+            while len(_sessions) > current_app.config['SESSION_POOL_SIZE']:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(key)
+            entry[1] = now
+        return entry[0]
+
+
+def _expire(now):
+    # sessions are ordered by their last use, thus, the idle sessions are at the beginning
+    idle_timeout = current_app.config['SESSION_POOL_IDLE_TIMEOUT']
+    while _sessions:
+        key, entry = next(iter(_sessions.items()))
+        if now - entry[1] <= idle_timeout:
+            break
+        del _sessions[key]
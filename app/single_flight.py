@@ -0,0 +1,129 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import json
+import threading
+import time
+import uuid
+
+from redis.exceptions import RedisError
+from flask import current_app
+
+from app import metrics
+
+# identical evaluations which run concurrently are only computed once: within a worker, the callers wait for the
+# thread computing the result, across workers, for the worker holding the lock in Redis, which stores the result
+LOCK_PREFIX = 'policy-handler:single-flight:lock:'
+RESULT_PREFIX = 'policy-handler:single-flight:result:'
+# time in seconds the result is kept for the waiting workers, they poll for it every POLL_INTERVAL seconds
+RESULT_TTL = 10
+POLL_INTERVAL = 0.05
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+class _Call(object):
+    # evaluation in progress within this worker
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def coalesce(key, compute):
+    # returns the result of compute(), which has to be JSON serializable, and shares it with all callers passing the
+    # same key while it is computed. If the computation fails, the callers waiting in this worker get the same
+    # error, waiting workers compute the result themselves
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if not call.done.wait(current_app.config['SINGLE_FLIGHT_TIMEOUT']):
+            current_app.logger.warning('Identical evaluation takes too long, evaluating again')
+            return compute()
+        metrics.count_coalesced('worker')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _coalesce_across_workers(key, compute)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.done.set()
+
+
+def _coalesce_across_workers(key, compute):
+    # the lock contains the ID of the evaluation holding it, which identifies its result
+    lock_key = LOCK_PREFIX + key
+    evaluation_id = str(uuid.uuid4())
+    timeout = current_app.config['SINGLE_FLIGHT_TIMEOUT']
+    try:
+        acquired = current_app.redis.set(lock_key, evaluation_id, nx=True, ex=int(timeout) + 1)
+        if not acquired:
+            result = _wait_for_result(lock_key, timeout)
+            if result is not None:
+                metrics.count_coalesced('redis')
+                return json.loads(result)
+            # the other worker failed, thus, the result is computed by this worker
+            return compute()
+    except RedisError as e:
+        current_app.logger.warning('Unable to coalesce evaluations across workers: ' + str(e))
+        return compute()
+
+    try:
+        result = compute()
+        try:
+            current_app.redis.set(RESULT_PREFIX + key + ':' + evaluation_id, json.dumps(result), ex=RESULT_TTL)
+        except RedisError as e:
+            current_app.logger.warning('Unable to share evaluation with other workers: ' + str(e))
+        return result
+    finally:
+        try:
+            current_app.redis.delete(lock_key)
+        except RedisError:
+            pass
+
+
+def _wait_for_result(lock_key, timeout):
+    # returns None if the lock was released without a result, e.g., as the evaluation failed, or on timeout
+    evaluation_id = current_app.redis.get(lock_key)
+    if evaluation_id is None:
+        return None
+    result_key = RESULT_PREFIX + lock_key[len(LOCK_PREFIX):] + ':' + evaluation_id.decode('utf-8')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        pipeline = current_app.redis.pipeline()
+        pipeline.get(result_key)
+        pipeline.exists(lock_key)
+        result, locked = pipeline.execute()
+        if result is not None or not locked:
+            return result
+        time.sleep(POLL_INTERVAL)
+    return None
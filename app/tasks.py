@@ -0,0 +1,52 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+from rq import get_current_job
+from werkzeug.exceptions import HTTPException
+
+from app import app, db, job_credentials
+from app.evaluation import evaluate_design_time
+from app.result_model import Result
+
+
+def execute_design_time_evaluation(**job_input):
+    # executed by the rq worker outside of a request, thus, the database session requires an application context
+    with app.app_context():
+        _execute_design_time_evaluation(job_credentials.unseal(job_input))
+
+
+def _execute_design_time_evaluation(evaluation_input):
+    # the result entry is created by the route before enqueuing the job
+    job = get_current_job()
+    app.logger.info('Starting design-time evaluation for job with ID: ' + str(job.get_id()))
+    result = Result.query.get(job.get_id())
+    try:
+        result.evaluation = evaluate_design_time(**evaluation_input)
+        app.logger.info('Design-time evaluation completed: ' + str(result.evaluation))
+    except HTTPException as e:
+        # e.g., programs for which the shots can only be determined at runtime
+        app.logger.info('Design-time evaluation rejected: ' + str(e))
+        result.error = str(e)[:1200]
+        result.status_code = e.code
+    except Exception as e:
+        app.logger.exception('Design-time evaluation failed')
+        result.error = (type(e).__name__ + ': ' + str(e))[:1200]
+        result.status_code = 500
+    result.complete = True
+    db.session.commit()
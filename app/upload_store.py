@@ -0,0 +1,131 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from flask import current_app
+
+from app import metrics
+
+# uploads are stored under the SHA-256 hash of their content, thus, identical workflows are only stored once
+UPLOAD_SUFFIX = '.zip'
+DIGEST_PATTERN = re.compile('^[0-9a-f]{64}$')
+# prefix of the files an upload is streamed to before it is moved to its final name
+TEMPORARY_PREFIX = '.upload-'
+CHUNK_SIZE = 1024 * 1024
+
+_last_eviction = 0.0
+
+
+def store(file):
+    # streams the uploaded file to the upload folder while hashing it and returns the hash of the content
+    directory = current_app.config['UPLOAD_FOLDER']
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    temporary = tempfile.NamedTemporaryFile(dir=directory, prefix=TEMPORARY_PREFIX, delete=False)
+    try:
+        with temporary:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                temporary.write(chunk)
+                size += len(chunk)
+        digest = digest.hexdigest()
+        path = upload_path(digest)
+        try:
+            # the same upload was stored before, it is only marked as recently used for the eviction
+            os.utime(path)
+            os.remove(temporary.name)
+            metrics.count_cache('upload', 'hit')
+        except FileNotFoundError:
+            # replacing is atomic, thus, concurrent uploads of the same content never read a partial file
+            os.replace(temporary.name, path)
+            metrics.count_cache('upload', 'miss')
+            current_app.logger.info('Stored upload with ' + str(size) + ' bytes as ' + digest)
+    except BaseException:
+        if os.path.exists(temporary.name):
+            os.remove(temporary.name)
+        raise
+
+    evict()
+    return digest
+
+
+def upload_path(digest):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], digest + UPLOAD_SUFFIX)
+
+
+def parse_digest(name):
+    # returns the hash if the name refers to a content-addressed upload, i.e., the hash with or without suffix
+    if name.endswith(UPLOAD_SUFFIX):
+        name = name[:-len(UPLOAD_SUFFIX)]
+    return name if DIGEST_PATTERN.match(name) else None
+
+
+def evict(force=False):
+    # removes uploads exceeding the maximum age and, if the folder exceeds the maximum size, the least recently used
+    # uploads. Uploads used within the grace period are kept as they may still be read by a running or queued
+    # evaluation. The folder is scanned at most once per UPLOAD_EVICTION_INTERVAL by each worker
+    global _last_eviction
+    now = time.time()
+    if not force and now - _last_eviction < current_app.config['UPLOAD_EVICTION_INTERVAL']:
+        return 0
+    _last_eviction = now
+
+    directory = current_app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            # removed by another worker in the meantime
+            continue
+    # least recently used first
+    entries.sort()
+
+    max_age = current_app.config['UPLOAD_MAX_AGE']
+    grace_period = current_app.config['UPLOAD_EVICTION_GRACE']
+    total_size = sum(size for _, size, _ in entries)
+    removed = 0
+    for used, size, path in entries:
+        age = now - used
+        if age < grace_period:
+            break
+        if age <= max_age and total_size <= current_app.config['UPLOAD_MAX_SIZE']:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+        total_size -= size
+
+    if removed:
+        current_app.logger.info('Evicted ' + str(removed) + ' uploads, ' + str(total_size) + ' bytes remaining')
+    return removed
@@ -17,118 +17,89 @@
 #  limitations under the License.
 # ******************************************************************************
 
-import os
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as LookupTimeout
 
-from braket.aws import AwsDevice, AwsDeviceType
-from qiskit import IBMQ
-import datetime
-import pytz
-from app import app
+from flask import current_app
 
+from app import device_cache, metrics, session_pool
+from app.device_descriptor import SIMULATOR
+from app.execution_windows import current_slot
 
-def compute_ibm_devices(token, simulators_allowed):
-    IBMQ.save_account(token=token)
-    provider = IBMQ.load_account()
-    backends = provider.backends()
+# each provider has its own threads for the lookups, thus, a provider which hangs does not delay the lookups of the
+# others, the per-device fetches of the cloud provider are bounded by a separate pool
+PROVIDER_LOOKUP_THREADS = 4
+_provider_executors = {provider: ThreadPoolExecutor(max_workers=PROVIDER_LOOKUP_THREADS,
+                                                    thread_name_prefix='provider-lookup-' + provider.lower())
+                       for provider in ('AWS', 'IBMQ')}
+
+# number of lookups of each provider which have not returned yet, including the ones the evaluation stopped waiting for
+_lookups_in_flight = {'AWS': 0, 'IBMQ': 0}
+_lookups_lock = threading.Lock()
+
+# list of the providers whose devices are missing in the current evaluation, e.g., to avoid caching its result
+skipped_providers = contextvars.ContextVar('skipped_providers', default=None)
+
+
+@metrics.timed('ibm-discovery')
+def compute_ibm_devices(session, simulators_allowed):
+    # the backend list is served from the device cache and only loaded from IBMQ if it is missing
+    backends = device_cache.get_ibm_backends(session.ibm_catalog_scope, session.ibm_backends)
     if not simulators_allowed:
-        backends = [device for device in backends if not device.configuration().simulator]
+        backends = [device for device in backends if not device.type == SIMULATOR]
 
     return backends
 
 
-def compute_aws_devices(simulators_allowed):
-    # get all online AwsDevices
-    device_list = AwsDevice.get_devices(statuses=['ONLINE'], types=['QPU', 'SIMULATOR'])
-
-    # only use gate-based QPUs and simulators
-    device_list = [device for device in device_list if
-                   (device.properties.service.deviceDocumentation.summary.__contains__('gate-model') or
-                    device.properties.service.deviceDocumentation.summary.__contains__('simulator'))]
+@metrics.timed('aws-discovery')
+def compute_aws_devices(session, simulators_allowed):
+    # get the descriptors of all online gate-based QPUs and simulators from the device cache
+    device_list = device_cache.get_aws_devices(session.aws_catalog_scope, session.aws_devices)
 
     # if simulators are not allowed do not include them in the result list
     if not simulators_allowed:
-        device_list = [device for device in device_list if not device.type == AwsDeviceType.SIMULATOR]
+        device_list = [device for device in device_list if not device.type == SIMULATOR]
 
-    # check if execution window (given in UTC) corresponds to the current time
-    current_time = datetime.datetime.now(tz=pytz.UTC)
-    current_day = current_time.day
-    current_hour = current_time.hour
-    print(current_time.date())
+    # check if execution window (given in UTC) corresponds to the current time, the windows of each device are
+    # compiled into a weekly bitmap when the catalog is loaded, thus, this is a single lookup per device
+    slot = current_slot()
+    result = [device for device in device_list if device.execution_windows.is_available(slot)]
 
-    result = []
-    for device in device_list:
-        print(device.name)
-        for executionWindow in device.properties.service.executionWindows:
-            execution_day = executionWindow.executionDay.value
-            execution_window_start = executionWindow.windowStartHour.hour
-            execution_window_end = executionWindow.windowEndHour.hour
-            print(execution_window_start)
-            print(execution_window_end)
-            if current_time.today().weekday() < 5 and execution_day == 'Weekday':
-                # check if the execution_window corresponds to the actual time
-                available = compare_execution_window_with_actual_time(current_hour, execution_window_start,
-                                                                      execution_window_end)
-
-                if available:
-                    if device not in result:
-                        result.append(device)
-
-            elif current_time.today().weekday() >= 5 and execution_day == 'Weekend':
-                # check if the execution_window corresponds to the actual time
-                available = compare_execution_window_with_actual_time(current_hour, execution_window_start,
-                                                                      execution_window_end)
-
-                # check if the execution_window corresponds to the actual time
-                if available:
-                    if device not in result:
-                        result.append(device)
-
-            elif execution_day == current_day or execution_day == 'Everyday':
-                # check if the execution_window corresponds to the actual time
-                available = compare_execution_window_with_actual_time(current_hour, execution_window_start,
-                                                                      execution_window_end)
-
-                # check if the execution_window corresponds to the actual time
-                if available:
-                    if device not in result:
-                        result.append(device)
-            else:
-                print("The execution window of the QPU")
-                print(device.name)
-
-    app.logger.info(result)
-    return result,
-
-
-def compare_execution_window_with_actual_time(current_hour, execution_window_start, execution_window_end):
-    # check if the execution_window corresponds to the actual time
-    if execution_window_start <= current_hour < execution_window_end:
-        return True
-    return False
-
-
-def add_devices_for_evaluation(token, simulators_allowed, custom_environment_policy_set):
+    current_app.logger.info(result)
+    return result
+
+
+def add_devices_for_evaluation(session, simulators_allowed, custom_environment_policy_set):
     devices = []
     backends = []
-    app.logger.info("SIMULATORS ALLOWED")
-    app.logger.info(simulators_allowed)
-    app.logger.info(custom_environment_policy_set)
+    current_app.logger.info("SIMULATORS ALLOWED")
+    current_app.logger.info(simulators_allowed)
+    current_app.logger.info(custom_environment_policy_set)
+    # query the providers concurrently, thus, the discovery only takes as long as the slowest provider
+    started = time.monotonic()
+    # the lookups run in a copy of the context to include them in the trace of profiled requests
+    aws_lookup = submit_provider_lookup('AWS', compute_aws_devices, session, simulators_allowed)
+
     # custom environment policy specifies that custom dependencies have to be installed
     # Qiskit Runtime cannot be used
     if not custom_environment_policy_set:
-        backends = compute_ibm_devices(token, simulators_allowed)
+        ibm_lookup = submit_provider_lookup('IBMQ', compute_ibm_devices, session, simulators_allowed)
+        deadline = started + current_app.config['DISCOVERY_TIMEOUT_IBM']
+        backends = collect_provider_lookup('IBMQ', ibm_lookup, deadline, [])
 
         # print the list of ibm backends
         for backend in backends:
-            app.logger.info("IN BACKENDS")
-            app.logger.info(backend.name())
-            devices.append(backend.name())
+            current_app.logger.info("IN BACKENDS")
+            current_app.logger.info(backend.name)
+            devices.append(backend.name)
 
-    device_list = compute_aws_devices(simulators_allowed)
+    device_list = collect_provider_lookup('AWS', aws_lookup, started + current_app.config['DISCOVERY_TIMEOUT_AWS'], [])
 
     # print the list of aws devices
     for device in device_list:
-        app.logger.info(device)
+        current_app.logger.info(device)
         # print(device.properties)
         # print(device.status)
         devices.append(device)
@@ -136,15 +107,57 @@ def add_devices_for_evaluation(token, simulators_allowed, custom_environment_pol
     return device_list, backends
 
 
+def submit_provider_lookup(provider, lookup, *args):
+    # returns None if all threads of the provider are still blocked by previous lookups, the provider is skipped then
+    # instead of queueing behind them until one of the lookups returns
+    with _lookups_lock:
+        if _lookups_in_flight[provider] >= PROVIDER_LOOKUP_THREADS:
+            return None
+        _lookups_in_flight[provider] += 1
+    try:
+        future = _provider_executors[provider].submit(contextvars.copy_context().run, lookup, *args)
+    except Exception:
+        _release_provider_lookup(provider)
+        raise
+    future.add_done_callback(lambda f: _release_provider_lookup(provider))
+    return future
+
+
+def _release_provider_lookup(provider):
+    with _lookups_lock:
+        _lookups_in_flight[provider] -= 1
+
+
+def collect_provider_lookup(provider, lookup, deadline, default):
+    # a provider which is slow or down must not fail the evaluation, continue with the devices of the others
+    if lookup is None:
+        metrics.count_provider_error(provider, 'saturated')
+        current_app.logger.warning('All lookups of ' + provider + ' devices are pending, continuing without them')
+        skip_provider(provider)
+        return default
+    try:
+        return lookup.result(timeout=max(0.0, deadline - time.monotonic()))
+    except LookupTimeout:
+        metrics.count_provider_error(provider, 'timeout')
+        current_app.logger.warning('Discovery of ' + provider + ' devices timed out, continuing without them')
+    except Exception as e:
+        metrics.count_provider_error(provider, 'error')
+        current_app.logger.error('Discovery of ' + provider + ' devices failed, continuing without them: ' + str(e))
+    skip_provider(provider)
+    return default
+
+
+def skip_provider(provider):
+    skipped = skipped_providers.get()
+    if skipped is not None:
+        skipped.append(provider)
+
+
+@metrics.timed('authentication')
 def authenticate(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region):
-    # this will allow you to authenticate to aws
-    os.environ["AWS_ACCESS_KEY_ID"] = aws_access_key_id
-    os.environ["AWS_SECRET_ACCESS_KEY"] = aws_secret_access_key
-    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
-    app.logger.info("YOU ARE AUTHENTICATED")
-    # authentication to ibm
-    #IBMProvider.save_account(token=ibm_token)
-    if IBMQ.active_account():
-        IBMQ.disable_account()
-    IBMQ.enable_account(ibm_token, url='https://auth.quantum-computing.ibm.com/api', hub='ibm-q', group='open', project='main')
+    # returns the authenticated sessions of the given credentials from the session pool, the clients of previous
+    # requests with the same credentials are reused and the credentials are not written into os.environ
+    session = session_pool.get_session(ibm_token, aws_access_key_id, aws_secret_access_key, aws_region)
+    current_app.logger.info("YOU ARE AUTHENTICATED")
+    return session
 
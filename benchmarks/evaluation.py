@@ -0,0 +1,330 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+# End-to-end benchmark of the design time and the runtime evaluation.
+#
+# Sends requests to both evaluation endpoints via the Flask test client. The devices come from the fake provider
+# (see app.providers.fake), and the uploaded programs are generated. For each scenario, the script reports the
+# p50/p95/p99 latency of the request and of each stage, the throughput, and the peak RSS. The results can be stored
+# as a baseline, and later runs are compared against it to detect regressions. Redis is used via REDIS_URL, or
+# fakeredis with --fake-redis (pip install fakeredis).
+#
+# Usage: python benchmarks/evaluation.py [--devices 100,1000] [--tasks 1,10] [--requests 20] [--concurrency 1]
+#                                        [--cold] [--decision-cache] [--fake-redis] [--save-baseline FILE] [--baseline FILE]
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# the providers are replaced by synthetic catalogs and the uploads are stored in a temporary folder
+os.environ['PROVIDER'] = 'fake'
+_work_directory = tempfile.mkdtemp(prefix='policy-handler-benchmark-')
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(_work_directory, 'files'))
+os.environ.setdefault('RESULT_FOLDER', os.path.join(_work_directory, 'generated-files'))
+
+import logging  # noqa: E402
+
+import app.evaluation  # noqa: E402
+import app.policy_evaluation.availability_evaluation as availability_evaluation  # noqa: E402
+import app.policy_evaluation.money_evaluation as money_evaluation  # noqa: E402
+import app.policy_evaluation.ranking as ranking  # noqa: E402
+import app.policy_evaluation.scoring as scoring  # noqa: E402
+import app.utils  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from app.device_cache import CACHE_PREFIX  # noqa: E402
+from app.policy_evaluation.analysis_cache import ACCESS_KEY, ENTRY_PREFIX  # noqa: E402
+from app.policy_evaluation.decision_cache import CACHE_PREFIX as DECISION_PREFIX  # noqa: E402
+from app.policy_evaluation.queue_depth import QUEUE_DEPTH_PREFIX  # noqa: E402
+from shot_analysis import BRAKET_FUNCTION, BRAKET_HEADER  # noqa: E402
+
+DESIGN_TIME_URL = '/policy-handler/api/v1.0/design-time-evaluation-hybrid-runtime'
+RUNTIME_URL = '/policy-handler/api/v1.0/runtime-evaluation-hybrid-runtime'
+
+# functions of the evaluation which are measured as separate stages, by the name under which they are called, the
+# runtime evaluation imports them from their modules when it is executed
+STAGES = {
+    'authenticate': [(app.evaluation, 'authenticate'), (app.utils, 'authenticate')],
+    'discovery': [(app.evaluation, 'add_devices_for_evaluation'), (app.utils, 'compute_aws_devices')],
+    'costs': [(app.evaluation, 'calculate_costs'), (money_evaluation, 'calculate_costs_aws'),
+              (money_evaluation, 'calculate_costs_qiskit')],
+    'availability': [(app.evaluation, 'evaluate_availability_aws'), (app.evaluation, 'evaluate_availability_qiskit'),
+                     (availability_evaluation, 'evaluate_availability_aws'),
+                     (availability_evaluation, 'evaluate_availability_qiskit')],
+    'ranking': [(app.evaluation, 'score_matrix'), (app.evaluation, 'rank_devices'), (scoring, 'score_devices'),
+                (ranking, 'rank_devices')],
+}
+
+CREDENTIALS = {'ibmqToken': 'benchmark', 'awsAccessKey': 'benchmark', 'awsSecretAccessKey': 'benchmark'}
+
+_current = threading.local()
+_rss_lock = threading.Lock()
+_peak_rss = {}
+
+
+def current_rss():
+    # resident set size in KB, the peak of the process is used if /proc is not available
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measured(stage, function):
+    def wrapper(*args, **kwargs):
+        # functions of a stage which call each other, e.g., the device discovery, are only measured once
+        active = getattr(_current, 'active', None)
+        if active is None:
+            active = _current.active = set()
+        if stage in active:
+            return function(*args, **kwargs)
+        active.add(stage)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            active.discard(stage)
+            durations = getattr(_current, 'durations', None)
+            if durations is not None:
+                durations[stage] = durations.get(stage, 0.0) + time.perf_counter() - started
+            rss = current_rss()
+            with _rss_lock:
+                _peak_rss[stage] = max(_peak_rss.get(stage, 0), rss)
+    return wrapper
+
+
+def instrument():
+    for stage, functions in STAGES.items():
+        for module, name in functions:
+            setattr(module, name, measured(stage, getattr(module, name)))
+
+
+def generate_upload(tasks, functions):
+    # one folder per task containing a program with the given number of quantum functions, the shots differ per
+    # task, thus, each program is analyzed separately
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for task in range(tasks):
+            source = BRAKET_HEADER + ''.join(BRAKET_FUNCTION.format(index=i, shots=100 * (i + task + 1))
+                                             for i in range(functions))
+            zip_file.writestr('task-' + str(task).zfill(4) + '/program.py', source)
+    return archive.getvalue()
+
+
+def design_time_request(client, upload, profile):
+    form = {
+        'ibmqToken': json.dumps({'ibmqToken': CREDENTIALS['ibmqToken']}),
+        'awsKeys': json.dumps({'awsKeys': {'awsAccessKey': CREDENTIALS['awsAccessKey'],
+                                           'awsSecretAccessKey': CREDENTIALS['awsSecretAccessKey']}}),
+        'moneyPolicy': json.dumps({'moneyPolicy': {'weight': 1}} if profile == 'cost' else {}),
+        'availabilityPolicy': json.dumps({'availabilityPolicy': {'weight': 1}}),
+        'privacyPolicy': json.dumps({'privacyPolicy': {'weight': 1, 'dataRetention': 'false',
+                                                       'thirdPartyQPU': 'false'}}),
+        'customEnvironmentPolicy': json.dumps({}),
+        'requiredPrograms': (io.BytesIO(upload), 'required-programs.zip'),
+    }
+    return client.post(DESIGN_TIME_URL, data=form, content_type='multipart/form-data')
+
+
+def runtime_request(client, backends):
+    payload = dict(CREDENTIALS)
+    payload.update({
+        # backends selected by NISQ
+        'devices': ','.join('fake_backend_' + str(index).zfill(4) for index in range(min(backends, 10))),
+        'money': json.dumps({'moneyWeight': 1, 'sumExecutionTimeClassical': 120, 'sumExecutionTimeQuantum': 30,
+                             'sumNumberOfQuantumShots': 1000, 'sumNumberOfQuantumTaks': 10}),
+        'availability': json.dumps({'availabilityWeight': 1}),
+        'privacy': json.dumps({'privacyWeight': 1, 'privacyPolicy': {'dataRetention': 'false',
+                                                                     'thirdPartyQPU': 'false'}}),
+        'customEnvironment': None,
+        'simulatorsAllowed': True,
+    })
+    return client.post(RUNTIME_URL, data=json.dumps(payload), content_type='application/json')
+
+
+def clear_caches(patterns=(CACHE_PREFIX + ':*', ENTRY_PREFIX + '*', ACCESS_KEY, QUEUE_DEPTH_PREFIX + '*',
+                            DECISION_PREFIX + ':*')):
+    for pattern in patterns:
+        keys = list(flask_app.redis.scan_iter(match=pattern))
+        if keys:
+            flask_app.redis.delete(*keys)
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    return {'p' + str(p): percentile(sorted(values), p) * 1000 for p in (50, 95, 99)}
+
+
+def percentile(ordered, p):
+    # linear interpolation between the closest ranks, like statistics.quantiles(method='inclusive') of Python 3.8
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_scenario(scenario, args):
+    flask_app.config['FAKE_PROVIDER_AWS_DEVICES'] = scenario['devices']
+    flask_app.config['FAKE_PROVIDER_IBM_BACKENDS'] = max(1, scenario['devices'] // 4)
+    upload = generate_upload(scenario['tasks'], args.functions) if scenario['endpoint'] == 'design-time' else None
+
+    def send(client):
+        if args.cold:
+            clear_caches()
+        elif not args.decision_cache:
+            # the identical requests would otherwise only measure the lookup of the first result
+            clear_caches([DECISION_PREFIX + ':entry:*'])
+        _current.durations = {}
+        started = time.perf_counter()
+        if scenario['endpoint'] == 'design-time':
+            response = design_time_request(client, upload, scenario['profile'])
+        else:
+            response = runtime_request(client, flask_app.config['FAKE_PROVIDER_IBM_BACKENDS'])
+        _current.durations['request'] = time.perf_counter() - started
+        durations, _current.durations = _current.durations, None
+        return response.status_code, response.get_data(as_text=True), durations
+
+    # the first request of each scenario fills the caches and is not measured unless --cold is given
+    if not args.cold:
+        send(flask_app.test_client())
+
+    _peak_rss.clear()
+    clients = threading.local()
+
+    def send_with_own_client(_):
+        if not hasattr(clients, 'client'):
+            clients.client = flask_app.test_client()
+        return send(clients.client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(send_with_own_client, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    errors = [(status, body) for status, body, _ in results if status >= 400]
+    if errors:
+        print('  ' + str(len(errors)) + ' failed requests, e.g., ' + str(errors[0][0]) + ': ' + errors[0][1][:200])
+    stages = {}
+    for stage in ['request'] + list(STAGES):
+        values = [durations[stage] for _, _, durations in results if stage in durations]
+        if values:
+            stages[stage] = percentiles(values)
+            stages[stage]['peakRssKb'] = _peak_rss.get(stage, current_rss())
+    return {'stages': stages, 'throughput': args.requests / elapsed, 'errors': len(errors),
+            'peakRssKb': current_rss()}
+
+
+def scenarios(args):
+    for devices in args.devices:
+        for tasks in args.tasks:
+            yield {'name': 'design-time/cost/d' + str(devices) + '/t' + str(tasks), 'endpoint': 'design-time',
+                   'profile': 'cost', 'devices': devices, 'tasks': tasks}
+        yield {'name': 'design-time/queue/d' + str(devices), 'endpoint': 'design-time', 'profile': 'queue',
+               'devices': devices, 'tasks': 1}
+        yield {'name': 'runtime/d' + str(devices), 'endpoint': 'runtime', 'devices': devices, 'tasks': 0}
+
+
+def compare(results, baseline, tolerance):
+    # returns the regressions of the median and p95 latency and of the throughput compared to the baseline
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        for metric in ('p50', 'p95'):
+            current, previous = result['stages']['request'][metric], reference['stages']['request'][metric]
+            if current > previous * (1 + tolerance):
+                regressions.append('{} {}: {:.1f} ms -> {:.1f} ms'.format(name, metric, previous, current))
+        if result['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append('{} throughput: {:.1f}/s -> {:.1f}/s'.format(name, reference['throughput'],
+                                                                         result['throughput']))
+    return regressions
+
+
+def integer_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation endpoints with synthetic devices')
+    parser.add_argument('--devices', type=integer_list, default=[100, 1000], help='numbers of synthetic AWS devices')
+    parser.add_argument('--tasks', type=integer_list, default=[1, 10], help='numbers of tasks of the upload')
+    parser.add_argument('--functions', type=int, default=10, help='quantum functions per program')
+    parser.add_argument('--requests', type=int, default=20, help='measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='number of concurrent clients')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay in seconds of each provider call')
+    parser.add_argument('--cold', action='store_true', help='clear all caches before each request')
+    parser.add_argument('--decision-cache', action='store_true', help='reuse the results of identical evaluations')
+    parser.add_argument('--fake-redis', action='store_true', help='use fakeredis instead of REDIS_URL')
+    parser.add_argument('--save-baseline', metavar='FILE', help='store the results as baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the results with the given baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    if args.fake_redis:
+        import fakeredis
+        flask_app.redis = fakeredis.FakeRedis()
+    flask_app.config['FAKE_PROVIDER_LATENCY'] = args.latency
+    # the evaluation logs all devices on debug level, which would dominate the measurements
+    flask_app.logger.setLevel(logging.WARNING)
+    instrument()
+
+    results = {}
+    print('{:<32} {:<13} {:>10} {:>10} {:>10} {:>12} {:>9}'.format(
+        'scenario', 'stage', 'p50 [ms]', 'p95 [ms]', 'p99 [ms]', 'peak RSS [MB]', 'req/s'))
+    for scenario in scenarios(args):
+        result = results[scenario['name']] = run_scenario(scenario, args)
+        for stage, values in result['stages'].items():
+            print('{:<32} {:<13} {:>10.1f} {:>10.1f} {:>10.1f} {:>12.1f} {:>9}'.format(
+                scenario['name'], stage, values['p50'], values['p95'], values['p99'], values['peakRssKb'] / 1024,
+                '{:.1f}'.format(result['throughput']) if stage == 'request' else ''))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print('Stored baseline in ' + args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions compared to ' + args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+# Micro-benchmark of the shot analysis used during the design-time evaluation.
+#
+# Compares the ast based analyzer with the previously used RedBaron based analysis regarding runtime and peak
+# memory over a corpus of generated Braket and Qiskit programs of increasing size. RedBaron is no longer a
+# requirement of the policy handler, install it separately (pip install redbaron) to include it in the comparison.
+#
+# Usage: python benchmarks/shot_analysis.py [--repeat 5]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.policy_evaluation.shot_analyzer import analyze_shots  # noqa: E402
+
+BRAKET_HEADER = '''from braket.aws import AwsDevice
+from braket.circuits import Circuit
+
+device = AwsDevice("arn:aws:braket:::device/quantum-simulator/amazon/sv1")
+
+'''
+
+BRAKET_FUNCTION = '''
+def run_circuit_{index}(angle):
+    # build a parameterized circuit and estimate the expectation value
+    circuit = Circuit().h(0).cnot(0, 1).rx(1, angle).ry(0, angle / 2)
+    for qubit in range({index} % 5 + 2):
+        circuit.h(qubit)
+    task = device.run(circuit, shots={shots})
+    counts = task.result().measurement_counts
+    return sum(value for key, value in counts.items() if key.count("1") % 2 == 0) / {shots}
+'''
+
+QISKIT_HEADER = '''import qiskit
+from qiskit import QuantumCircuit, IBMQ
+
+provider = IBMQ.load_account()
+backend = provider.get_backend("ibmq_qasm_simulator")
+
+'''
+
+QISKIT_FUNCTION = '''
+def run_circuit_{index}(angle):
+    # build a parameterized circuit and sample it on the backend
+    circuit = QuantumCircuit(2, 2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.rx(angle, 1)
+    circuit.measure([0, 1], [0, 1])
+    job = qiskit.execute(circuit, backend, {shots})
+    counts = job.result().get_counts()
+    return counts.get("00", 0) / {shots}
+'''
+
+
+def generate_corpus():
+    # programs with 1 to 200 quantum functions, i.e., roughly 0.5 to 70 KB of source code
+    corpus = []
+    for header, function in ((BRAKET_HEADER, BRAKET_FUNCTION), (QISKIT_HEADER, QISKIT_FUNCTION)):
+        for functions in (1, 10, 50, 200):
+            source = header + ''.join(function.format(index=i, shots=100 * (i + 1)) for i in range(functions))
+            name = ('braket' if header is BRAKET_HEADER else 'qiskit') + '-' + str(functions)
+            corpus.append((name, source))
+    return corpus
+
+
+def analyze_with_ast(source):
+    return analyze_shots(source).as_tuple()
+
+
+def analyze_with_redbaron(source):
+    # traversal of the previous RedBaron based implementation for device.run and qiskit.execute statements
+    from redbaron import RedBaron
+    red = RedBaron(source)
+    counts = [0] * 6
+    for function in red.find_all('def'):
+        for node in function.find_all('atomtrailers'):
+            if node[0].value == 'device' and node[1].value == 'run':
+                counts[0] += 1
+                counts[1] += int(node[2].value[1].value.value)
+            if node[0].value == 'qiskit' and node[1].value == 'execute':
+                counts[4] += 1
+                counts[5] += int(node[2].value[2].value.value)
+    return tuple(counts)
+
+
+def measure(analyzer, source, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = analyzer(source)
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    analyzer(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(durations), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot analysis of uploaded programs')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per program')
+    args = parser.parse_args()
+
+    try:
+        import redbaron  # noqa: F401
+        analyzers = [('ast', analyze_with_ast), ('redbaron', analyze_with_redbaron)]
+    except ImportError:
+        print('RedBaron is not installed, only the ast analyzer is measured')
+        analyzers = [('ast', analyze_with_ast)]
+
+    print('{:<12} {:>9} {:>10} {:>12} {:>12} {:>9} {:>10}'.format(
+        'program', 'size [KB]', 'analyzer', 'median [ms]', 'peak [KB]', 'speedup', 'memory'))
+    for name, source in generate_corpus():
+        measurements = [(analyzer_name, measure(analyzer, source, args.repeat)) for analyzer_name, analyzer in
+                        analyzers]
+        results = set(result for _, (result, _, _) in measurements)
+        if len(results) > 1:
+            print('Analyzers disagree for ' + name + ': ' + str(results))
+            sys.exit(1)
+
+        _, (_, reference_duration, reference_peak) = measurements[-1]
+        for analyzer_name, (_, duration, peak) in measurements:
+            print('{:<12} {:>9.1f} {:>10} {:>12.2f} {:>12.1f} {:>8.1f}x {:>9.1f}x'.format(
+                name, len(source) / 1024, analyzer_name, duration * 1000, peak / 1024,
+                reference_duration / duration, reference_peak / peak))
+
+
+if __name__ == '__main__':
+    main()
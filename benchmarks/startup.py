@@ -0,0 +1,121 @@
+# ******************************************************************************
+#  Copyright (c) 2023 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+# Benchmark of the cold import time of the policy handler.
+#
+# Each measurement imports a module in a fresh interpreter, as it happens when a gunicorn worker boots, when the
+# flask CLI runs the migrations, or when the rq worker executes a job. Besides the import time, the script reports
+# which of the heavy libraries were loaded by the import, as they should only be loaded on first use. The results can
+# be stored as a baseline, and later runs are compared against it to detect regressions.
+#
+# Usage: python benchmarks/startup.py [--repeat 5] [--save-baseline FILE] [--baseline FILE]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# entry points of the processes, the evaluation is imported by the first request
+SCENARIOS = {
+    'web-worker': 'app',
+    'rq-job': 'app.tasks',
+    'first-evaluation': 'app.evaluation',
+}
+
+# libraries with a long import time, which are only required by the evaluation
+HEAVY_MODULES = ['braket', 'qiskit', 'boto3', 'numpy', 'redbaron']
+
+MEASUREMENT = '''
+import json, sys, time
+started = time.perf_counter()
+__import__({module!r})
+duration = time.perf_counter() - started
+print(json.dumps({{'duration': duration * 1000, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def measure(module):
+    environment = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c',
+                             MEASUREMENT.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=ROOT, env=environment, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def run_scenario(module, repeat):
+    # the first run only ensures that the bytecode is compiled, as it is in the Docker image
+    measure(module)
+    measurements = [measure(module) for _ in range(repeat)]
+    durations = [measurement['duration'] for measurement in measurements]
+    return {'module': module, 'min': min(durations), 'median': statistics.median(durations),
+            'max': max(durations), 'loaded': measurements[-1]['loaded']}
+
+
+def compare(results, baseline, tolerance):
+    # returns the regressions of the median import time and the heavy libraries which are loaded additionally
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        if result['median'] > reference['median'] * (1 + tolerance):
+            regressions.append('{} median: {:.1f} ms -> {:.1f} ms'.format(name, reference['median'],
+                                                                        result['median']))
+        for module in sorted(set(result['loaded']) - set(reference['loaded'])):
+            regressions.append('{} imports {} on startup'.format(name, module))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cold import time of the policy handler')
+    parser.add_argument('--repeat', type=int, default=5, help='measured imports per scenario')
+    parser.add_argument('--save-baseline', metavar='FILE', help='store the results as baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the results with the given baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    results = {}
+    print('{:<18} {:<16} {:>10} {:>12} {:>10}  {}'.format(
+        'scenario', 'module', 'min [ms]', 'median [ms]', 'max [ms]', 'heavy libraries'))
+    for name, module in SCENARIOS.items():
+        result = results[name] = run_scenario(module, args.repeat)
+        print('{:<18} {:<16} {:>10.1f} {:>12.1f} {:>10.1f}  {}'.format(
+            name, module, result['min'], result['median'], result['max'], ', '.join(result['loaded']) or '-'))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print('Stored baseline in ' + args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions compared to ' + args.baseline)
+
+
+if __name__ == '__main__':
+    main()